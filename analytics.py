@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func
+
+from history_store import DAY
+from models import db, SymbolStats, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+SMA_WINDOWS = (20, 50, 200)
+EMA_SPANS = (12, 26)
+RETURN_OFFSETS = {'return_1d': 1, 'return_1w': 5, 'return_1m': 21}  # trading days
+VOLATILITY_WINDOW = 20
+TRADING_DAYS = 252
+YEAR_DAYS = 365
+
+# Bars needed for every windowed indicator; only this tail of the history is read
+TAIL = max(max(SMA_WINDOWS), VOLATILITY_WINDOW + 1, max(RETURN_OFFSETS.values()) + 1)
+
+# Bars folded into an EMA per vectorized step; keeps the decay powers well inside float range
+EMA_CHUNK = 64
+
+STAT_COLUMNS = [c.name for c in SymbolStats.__table__.columns if c.name != 'symbol']
+
+
+def ema_fold(state, values, alpha):
+    """
+    Apply state = state + alpha * (x - state) for each value in order, vectorized in
+    chunks via the closed form, and return the EMA after every value.
+    """
+    out = np.empty(len(values))
+    decay = 1.0 - alpha
+    for start in range(0, len(values), EMA_CHUNK):
+        chunk = values[start:start + EMA_CHUNK]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        out[start:start + len(chunk)] = powers * (state + alpha * np.cumsum(chunk / powers))
+        state = out[start + len(chunk) - 1]
+    return out
+
+
+def _float(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _emas(ts, close, previous):
+    """
+    EMA values for the last bar and the bar before it, folding only bars after the
+    stored base when it is still present in the history.
+    """
+    start, states = 1, {span: close[0] for span in EMA_SPANS}
+    if previous is not None and previous.base_ts is not None:
+        i = int(np.searchsorted(ts, previous.base_ts, side='left'))
+        if i < len(ts) and ts[i] == previous.base_ts:
+            start = i + 1
+            states = {span: getattr(previous, f'ema_{span}_base') for span in EMA_SPANS}
+
+    stats = {'base_ts': int(ts[-2]) if len(ts) > 1 else None}
+    new = np.asarray(close[start:], dtype='f8')
+    for span in EMA_SPANS:
+        values = ema_fold(states[span], new, 2.0 / (span + 1))
+        stats[f'ema_{span}'] = float(values[-1]) if len(values) else float(states[span])
+        if len(ts) < 2:
+            stats[f'ema_{span}_base'] = None
+        else:
+            stats[f'ema_{span}_base'] = float(values[-2]) if len(values) > 1 else float(states[span])
+    return stats
+
+
+def compute_stats(symbol, bars, previous=None):
+    """
+    Indicators for symbol from its stored bars, or None if the last bar is unchanged
+    since previous (the stored SymbolStats row). Only the tail of the history is
+    read; EMAs continue from the stored state instead of replaying all bars.
+    """
+    ts = bars['ts']
+    close = bars['close']
+    last_ts = int(ts[-1])
+    if previous is not None and previous.as_of == last_ts and previous.close == float(close[-1]):
+        return None
+
+    tail = np.asarray(close[-TAIL:], dtype='f8')
+    stats = {'symbol': symbol, 'as_of': last_ts, 'close': float(tail[-1]), 'updated_at': datetime.utcnow()}
+    for window in SMA_WINDOWS:
+        stats[f'sma_{window}'] = float(tail[-window:].mean()) if len(tail) >= window else None
+    for column, offset in RETURN_OFFSETS.items():
+        stats[column] = float(tail[-1] / tail[-1 - offset] - 1) if len(tail) > offset else None
+
+    log_returns = np.diff(np.log(tail[-(VOLATILITY_WINDOW + 1):]))
+    stats['volatility_20'] = (float(log_returns.std(ddof=1) * np.sqrt(TRADING_DAYS))
+                              if len(log_returns) == VOLATILITY_WINDOW else None)
+
+    year = bars[np.searchsorted(ts, last_ts - YEAR_DAYS * DAY, side='right'):]
+    stats['high_52w'] = _float(np.nanmax(year['high'])) if not np.isnan(year['high']).all() else None
+    stats['low_52w'] = _float(np.nanmin(year['low'])) if not np.isnan(year['low']).all() else None
+
+    stats.update(_emas(ts, close, previous))
+    return stats
+
+
+def _store(rows):
+    if not rows:
+        return
+    stmt = dialect_insert(SymbolStats.__table__, db.engine)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['symbol'],
+        set_={column: getattr(stmt.excluded, column) for column in STAT_COLUMNS},
+    )
+    db.session.execute(stmt, rows)
+    db.session.commit()
+
+
+def update_symbol_stats(history_store, symbols):
+    """
+    Recompute indicators for every symbol whose stored bars changed since the last
+    run and upsert them in one transaction. Must be called inside an application
+    context. Returns the number of symbols updated.
+    """
+    existing = {row.symbol: row for row in SymbolStats.query.filter(SymbolStats.symbol.in_(symbols))}
+    rows = []
+    for symbol in symbols:
+        try:
+            bars = history_store.bars(symbol)
+            if len(bars) == 0:
+                continue
+            stats = compute_stats(symbol, bars, existing.get(symbol))
+        except Exception as e:
+            logger.error(f"Error computing indicators for {symbol}: {e}")
+            continue
+        if stats is not None:
+            rows.append(stats)
+    _store(rows)
+    logger.info(f"Updated indicators for {len(rows)}/{len(symbols)} symbols")
+    return len(rows)
+
+
+def load_stats(symbols):
+    """
+    Stored indicators for symbols as a dict of symbol -> SymbolStats (missing symbols omitted).
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    return {row.symbol: row for row in SymbolStats.query.filter(SymbolStats.symbol.in_(symbols))}
+
+
+def stats_version():
+    """
+    Token that changes whenever any stored indicators change.
+    """
+    return db.session.query(func.max(SymbolStats.updated_at)).scalar()
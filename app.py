@@ -1,19 +1,14 @@
+import json
 import logging
 import os
+import queue
 import time
-import pandas as pd
-from datetime import datetime, date
 
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend for matplotlib
-
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-import yfinance as yf
 from werkzeug.security import generate_password_hash, check_password_hash
-import io
-import matplotlib.pyplot as plt
+
+from db_config import database_uri, engine_options
 
 # Set up error logging
 logging.basicConfig(level=logging.INFO)
@@ -22,122 +17,151 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app and configuration
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key_here'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database/app.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # largest accepted upload (holdings import)
 
-# Initialize database and login manager
-db = SQLAlchemy(app)
+# Initialize login manager
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.init_app(app)
 
-# Import models from models.py
-from models import db as models_db, User, Favorite, Holding
-models_db.init_app(app)
-
-# Create tables if they don’t already exist
+# Import models from models.py (one shared SQLAlchemy instance and connection pool)
+from models import db, User, Favorite, Holding, dialect_insert
+from migrations import migrate
+from price_engine import get_price, get_prices, refresh_prices, price_cache
+from quote_stream import QuoteHub, SubscriptionLimitError
+from market_snapshot import MarketSnapshot
+from scheduler import MarketDataScheduler
+from update_market_data import update_market_data, MARKET_DATA_CSV
+from symbols import asset_classes, all_tickers, get_registry
+from history_store import HistoryStore
+from valuation import load_holdings, value_positions, summarize
+from symbol_metadata import get_metadata, prefetch_metadata
+from analytics import update_symbol_stats, load_stats, stats_version
+from portfolio_history import snapshot_portfolios, load_snapshots, has_snapshots
+from concurrency import run_blocking
+import web_cache
+from web_cache import FileText, UserCache, conditional_page
+from holdings_io import import_holdings, export_csv, validate_lot, ImportFileError
+from charts import ChartCache, render_line_chart, PERIODS, PERIOD_LABELS
+import metrics
+db.init_app(app)
+
+# Request latency, SQL and upstream instrumentation, served at /metrics
+metrics.init_app(app)
+
+# Fingerprinted static URLs with immutable caching, and response compression
+web_cache.init_app(app)
+
+# Create tables if they don’t already exist and apply schema revisions
 with app.app_context():
-    models_db.create_all()
+    migrate()
 
 # -------------------------------
-# In-memory cache for live price data (for detail view)
-price_cache = {}
-CACHE_DURATION = 300  # seconds
+# Parsed once per process; reloaded only when the CSV file changes
+market_snapshot = MarketSnapshot(MARKET_DATA_CSV, asset_classes, names=get_registry().names)
 
-def get_price(symbol):
-    """
-    Retrieve the latest live price for a given symbol.
-    Uses fast_info first, falls back to detailed info, and caches the result.
-    (Used on the detail page only.)
-    """
-    now = time.time()
-    if symbol in price_cache:
-        cached_price, timestamp = price_cache[symbol]
-        if now - timestamp < CACHE_DURATION:
-            return cached_price
+# Local daily price history (memory-mapped .npy files per symbol)
+history_store = HistoryStore()
 
-    try:
-        ticker = yf.Ticker(symbol)
-        fast_info = ticker.fast_info
-        price = fast_info.get('last_price')
-        if price is None:
-            info = ticker.info
-            price = info.get('regularMarketPrice') or info.get('currentPrice') or info.get('previousClose')
-        if price is None:
-            price = 'N/A'
-    except Exception as e:
-        logger.error(f"Error fetching live price for {symbol}: {e}")
-        price = 'N/A'
-    price_cache[symbol] = (price, now)
-    return price
+# Rendered PNG charts keyed by (symbol, period, history version)
+chart_cache = ChartCache()
 
-# -------------------------------
-# Update Market Data Daily (CSV with columns: symbol, open, high, low, close, volume)
-def update_market_data():
+# Live quote streaming: one upstream poll per interval for every streamed symbol
+MAX_QUOTE_SYMBOLS = 100
+QUOTE_STREAM_INTERVAL = int(os.environ.get('QUOTE_STREAM_INTERVAL', 15))  # seconds between polls
+QUOTE_STREAM_KEEPALIVE = 20  # seconds
+quote_hub = QuoteHub(refresh_prices, interval=QUOTE_STREAM_INTERVAL)
+
+# Refresh market data in the background; the app serves the last good file meanwhile.
+# One process per host fetches (file lock); set MARKET_DATA_SCHEDULER=0 to disable.
+MARKET_DATA_REFRESH_INTERVAL = int(os.environ.get('MARKET_DATA_REFRESH_INTERVAL', 900))  # seconds
+MARKET_DATA_REFRESH_DURATION = metrics.registry.histogram(
+    'market_data_refresh_duration_seconds', "Duration of each market data refresh stage.", ('stage',),
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+MARKET_DATA_LAST_REFRESH = metrics.registry.gauge(
+    'market_data_last_refresh_timestamp_seconds', "Unix time of the last completed market data refresh.")
+
+
+def refresh_market_data():
     """
-    Downloads market data for a set of symbols and saves them to market_data.csv.
-    If the CSV file exists and was updated today, it does not update again.
+    Scheduler job: refresh the market data snapshot, append new daily bars for the
+    whole universe and every other stored symbol (charted on demand) to the price
+    history store, update the precomputed indicators, snapshot every user's
+    portfolio value and prefetch missing symbol metadata.
     """
-    csv_file = "market_data.csv"
-    if os.path.exists(csv_file):
-        mod_time = datetime.fromtimestamp(os.path.getmtime(csv_file)).date()
-        if mod_time == date.today():
-            logger.info("Market data CSV is up-to-date.")
-            return
-
-    # Define symbol lists.
-    top_shares = ["RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS"]
-    currencies = ["USDINR=X", "EURINR=X", "GBPINR=X", "JPYINR=X", "AUDINR=X"]
-    commodities = ["GOLDBEES.NS", "SILVERBEE.NS"]
-
-    all_symbols = top_shares + currencies + commodities
-    data_rows = []
-    for symbol in all_symbols:
-        try:
-            ticker = yf.Ticker(symbol)
-            time.sleep(1)  # Optional delay to help avoid rate limits
-            hist = ticker.history(period="1d")
-            if hist.empty:
-                logger.error(f"No historical data for {symbol}")
-                continue
-            # Get the latest available row
-            row = hist.iloc[-1]
-            data_rows.append({
-                "symbol": symbol,
-                "open": row["Open"],
-                "high": row["High"],
-                "low": row["Low"],
-                "close": row["Close"],
-                "volume": row["Volume"]
-            })
-            logger.info(f"Fetched market data for {symbol}")
-        except Exception as e:
-            logger.error(f"Error fetching market data for {symbol}: {e}")
-
-    df = pd.DataFrame(data_rows)
-    df.to_csv(csv_file, index=False)
-    logger.info(f"Market data updated and saved to {csv_file}")
-
-# Update market data at startup
-update_market_data()
+    with MARKET_DATA_REFRESH_DURATION.time(stage='snapshot'):
+        update_market_data()
+    with MARKET_DATA_REFRESH_DURATION.time(stage='history'):
+        history_store.sync_many(list(dict.fromkeys(all_tickers + history_store.symbols())))
+    with app.app_context():
+        with MARKET_DATA_REFRESH_DURATION.time(stage='analytics'):
+            update_symbol_stats(history_store, all_tickers)
+        with MARKET_DATA_REFRESH_DURATION.time(stage='portfolios'):
+            snapshot_portfolios(market_snapshot, history_store, fetch=get_prices)
+        with MARKET_DATA_REFRESH_DURATION.time(stage='metadata'):
+            prefetch_metadata(all_tickers)
+    MARKET_DATA_LAST_REFRESH.set(time.time())
+
+
+market_data_scheduler = MarketDataScheduler(refresh_market_data, MARKET_DATA_REFRESH_INTERVAL, MARKET_DATA_CSV)
+if os.environ.get('MARKET_DATA_SCHEDULER', '1') != '0':
+    market_data_scheduler.start()
+
+
+def _market_data_age():
+    try:
+        return time.time() - os.path.getmtime(MARKET_DATA_CSV)
+    except OSError:
+        return None
+
+
+def _price_cache_events():
+    stats = price_cache.stats()
+    return {(event,): stats[key] for event, key in (('hit', 'hits'), ('miss', 'misses'), ('fetch', 'fetches'),
+                                                    ('coalesced', 'coalesced'), ('eviction', 'evictions'))}
+
+
+# Scrape-time views of state the app already tracks
+metrics.registry.gauge('market_data_age_seconds', "Seconds since the market data file was written.",
+                       callback=_market_data_age)
+metrics.registry.counter('price_cache_events_total', "Live price cache lookups and fetches, by event.",
+                         ('event',), callback=_price_cache_events)
+metrics.registry.gauge('price_cache_hit_ratio', "Share of live price lookups served from the cache.",
+                       callback=lambda: price_cache.stats()['hit_ratio'])
+metrics.registry.gauge('price_cache_entries', "Entries in the live price cache.",
+                       callback=lambda: price_cache.stats()['entries'])
+metrics.registry.gauge('quote_stream_subscribers', "Open quote stream connections.",
+                       callback=lambda: quote_hub.stats()['subscribers'])
 
 # -------------------------------
 # User loader for flask-login
+# Logged-in users are cached briefly so most requests skip the user query
+user_cache = UserCache(User, ttl=int(os.environ.get('USER_CACHE_TTL', 300)))
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load(db.session, int(user_id))
 
 # -------------------------------
-# Context processor to inject contact info from contact.txt
+# Context processor to inject contact info from contact.txt (re-read only when it changes)
+contact_file = FileText('contact.txt', default="Contact us at support@example.com")
+
 @app.context_processor
 def inject_contact():
-    try:
-        with open('contact.txt', 'r') as f:
-            contact = f.read()
-    except Exception as e:
-        logger.error(f"Error reading contact.txt: {e}")
-        contact = "Contact us at support@example.com"
-    return dict(contact_info=contact)
+    return dict(contact_info=contact_file.get())
+
+# Data behind the list pages; their ETags change with it
+def _list_pages_version():
+    return market_snapshot.version, stats_version(), contact_file.version
+
+# -------------------------------
+# Template filter: fractional change as a signed percentage ("+1.23%"), "-" when unknown
+@app.template_filter('pct')
+def format_pct(value):
+    return "-" if value is None else f"{value * 100:+.2f}%"
 
 # -------------------------------
 # Home: Redirect to menu (if logged in) or to login page
@@ -194,11 +218,11 @@ def menu():
 @login_required
 def favorites():
     search = request.args.get('search', '')
-    favs = Favorite.query.filter_by(user_id=current_user.id).all()
+    query = Favorite.query.filter_by(user_id=current_user.id)
+    if search:
+        query = query.filter(Favorite.stock_symbol.ilike(f"%{search}%"))
     favorites_data = []
-    for fav in favs:
-        if search and search.lower() not in fav.stock_symbol.lower():
-            continue
+    for fav in query.all():
         favorites_data.append({
             'stock_symbol': fav.stock_symbol,
             'name': fav.stock_symbol,
@@ -212,11 +236,11 @@ def favorites():
 @login_required
 def add_favorite_post():
     symbol = request.form.get('symbol')
-    exists = Favorite.query.filter_by(stock_symbol=symbol, user_id=current_user.id).first()
-    if not exists:
-        new_fav = Favorite(stock_symbol=symbol, user_id=current_user.id)
-        db.session.add(new_fav)
-        db.session.commit()
+    # Insert-or-ignore: the unique (user_id, stock_symbol) index rejects duplicates
+    stmt = dialect_insert(Favorite.__table__, db.engine).values(stock_symbol=symbol, user_id=current_user.id)
+    result = db.session.execute(stmt.on_conflict_do_nothing())
+    db.session.commit()
+    if result.rowcount:
         flash('Favorite added', 'success')
     else:
         flash('Favorite already exists', 'warning')
@@ -227,171 +251,267 @@ def add_favorite_post():
 @app.route('/remove_favorite/<symbol>')
 @login_required
 def remove_favorite(symbol):
-    fav = Favorite.query.filter_by(stock_symbol=symbol, user_id=current_user.id).first()
-    if fav:
-        db.session.delete(fav)
-        db.session.commit()
+    removed = Favorite.query.filter_by(stock_symbol=symbol, user_id=current_user.id).delete()
+    db.session.commit()
+    if removed:
         flash('Favorite removed', 'success')
     return redirect(url_for('favorites'))
 
 # -------------------------------
-# "All Shares" Route – read details from CSV and use the "close" column as price
+# "All Shares" Route – read details from the market data snapshot ("close" is the price)
 @app.route('/shares')
 @login_required
+@conditional_page(_list_pages_version)
 def shares():
     search = request.args.get('search', '').lower()
-    try:
-        df = pd.read_csv("market_data.csv")
-    except Exception as e:
-        logger.error(f"Error reading market_data.csv: {e}")
-        df = pd.DataFrame(columns=["symbol", "open", "high", "low", "close", "volume"])
-
-    # Define your top shares list (adjust/extend as needed)
-    top_shares = ["RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS"]
-    df_shares = df[df["symbol"].isin(top_shares)]
+    shares_list = market_snapshot.records("share")
     if search:
-        df_shares = df_shares[
-            df_shares["symbol"].str.lower().str.contains(search)
-        ]
-    shares_list = df_shares.to_dict(orient="records")
-    for share in shares_list:
-        share["price"] = share.get("close", "N/A")
-        share["name"] = share.get("symbol", "N/A")
-    return render_template("shares.html", shares=shares_list)
+        matches = {e.symbol for e in get_registry().search(search, limit=None, asset_class="share")}
+        shares_list = [share for share in shares_list if share["symbol"] in matches]
+    stats = load_stats(share["symbol"] for share in shares_list)
+    return render_template("shares.html", shares=shares_list, stats=stats)
 
 # -------------------------------
-# "All Commodities" Route – read details from CSV
+# "All Commodities" Route – read details from the market data snapshot
 @app.route('/commodities')
 @login_required
+@conditional_page(_list_pages_version)
 def commodities():
-    try:
-        df = pd.read_csv("market_data.csv")
-    except Exception as e:
-        logger.error(f"Error reading market_data.csv: {e}")
-        df = pd.DataFrame(columns=["symbol", "open", "high", "low", "close", "volume"])
-
-    commodities_list = ["GOLDBEES.NS", "SILVERBEE.NS"]
-    df_comm = df[df["symbol"].isin(commodities_list)]
-    comm_data = df_comm.to_dict(orient="records")
-    for row in comm_data:
-        row["price"] = row.get("close", "N/A")
-        row["name"] = row.get("symbol", "N/A")
-    return render_template("commodities.html", commodities=comm_data)
+    commodities_list = market_snapshot.records("commodity")
+    stats = load_stats(commodity["symbol"] for commodity in commodities_list)
+    return render_template("commodities.html", commodities=commodities_list, stats=stats)
 
 # -------------------------------
-# "All Currencies" Route – read details from CSV
+# "All Currencies" Route – read details from the market data snapshot
 @app.route('/currencies')
 @login_required
+@conditional_page(_list_pages_version)
 def currencies():
-    try:
-        df = pd.read_csv("market_data.csv")
-    except Exception as e:
-        logger.error(f"Error reading market_data.csv: {e}")
-        df = pd.DataFrame(columns=["symbol", "open", "high", "low", "close", "volume"])
-
-    currencies_list = ["USDINR=X", "EURINR=X", "GBPINR=X", "JPYINR=X", "AUDINR=X"]
-    df_curr = df[df["symbol"].isin(currencies_list)]
-    curr_data = df_curr.to_dict(orient="records")
-    for row in curr_data:
-        row["price"] = row.get("close", "N/A")
-        row["name"] = row.get("symbol", "N/A")
-    return render_template("currencies.html", currencies=curr_data)
+    currencies_list = market_snapshot.records("currency")
+    stats = load_stats(currency["symbol"] for currency in currencies_list)
+    return render_template("currencies.html", currencies=currencies_list, stats=stats)
 
 # -------------------------------
 # "My Holdings" Route – live price fetch (for calculations)
+def _holding_prices(symbols):
+    prices = get_prices(symbols)
+    for symbol, price in prices.items():
+        if price == 'N/A':
+            # Fall back to the last stored daily close
+            prices[symbol] = history_store.last_close(symbol) or 'N/A'
+    return prices
+
 @app.route('/holdings', methods=['GET'])
 @login_required
 def holdings():
-    user_holdings = Holding.query.filter_by(user_id=current_user.id).all()
-    holdings_data = []
-    for h in user_holdings:
-        current_price = get_price(h.asset_symbol)
-        calc_price = current_price if isinstance(current_price, (int, float)) else 0
-        profit_loss = (calc_price - h.purchase_price) * h.quantity
-        profit_loss_pct = ((calc_price - h.purchase_price) / h.purchase_price * 100) if h.purchase_price != 0 else 0
-        holdings_data.append({
-            'asset_symbol': h.asset_symbol,
-            'asset_type': h.asset_type,
-            'quantity': h.quantity,
-            'purchase_price': h.purchase_price,
-            'current_price': current_price,
-            'profit_loss': round(profit_loss, 2),
-            'profit_loss_pct': round(profit_loss_pct, 2)
-        })
-    return render_template("holdings.html", holdings=holdings_data)
+    frame = load_holdings(current_user.id)
+    valued = value_positions(frame, _holding_prices(frame["price_symbol"]))
+    holdings_data = [{
+        'asset_symbol': row.asset_symbol,
+        'asset_type': row.asset_type,
+        'quantity': row.quantity,
+        'purchase_price': row.purchase_price,
+        'current_price': row.current_price if row.current_price == row.current_price else 'N/A',
+        'profit_loss': round(row.profit_loss, 2),
+        'profit_loss_pct': round(row.profit_loss_pct, 2)
+    } for row in valued.itertuples(index=False)]
+    return render_template("holdings.html", holdings=holdings_data, summary=summarize(valued),
+                           has_history=has_snapshots(current_user.id))
 
 @app.route('/holdings', methods=['POST'])
 @login_required
 def add_holding():
-    asset_type = request.form.get('asset_type')
-    asset_symbol = request.form.get('asset_symbol')
-    quantity = float(request.form.get('quantity'))
-    purchase_price = float(request.form.get('purchase_price'))
-    new_holding = Holding(
-        asset_type=asset_type,
-        asset_symbol=asset_symbol,
-        quantity=quantity,
-        purchase_price=purchase_price,
-        user_id=current_user.id
-    )
-    db.session.add(new_holding)
+    try:
+        lot = validate_lot(request.form)
+    except ValueError as e:
+        flash(f'Holding not added: {e}', 'danger')
+        return redirect(url_for('holdings'))
+    db.session.add(Holding(user_id=current_user.id, **lot))
     db.session.commit()
     flash('Holding added', 'success')
     return redirect(url_for('holdings'))
 
 # -------------------------------
-# "Share Page" Route – live price fetch on detail view
+# Bulk holdings import – CSV or XLSX with asset_type, asset_symbol, quantity, purchase_price
+# columns; valid rows are inserted in one transaction, rejected rows are listed by line.
+@app.route('/holdings/import', methods=['GET', 'POST'])
+@login_required
+def import_holdings_file():
+    if request.method == 'GET':
+        return render_template("holdings_import.html", result=None)
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        flash('Choose a CSV or XLSX file to import', 'danger')
+        return redirect(url_for('import_holdings_file'))
+    try:
+        result = run_blocking(import_holdings, current_user.id, upload.stream, upload.filename, engine=db.engine)
+    except ImportFileError as e:
+        flash(f'Import failed: {e}', 'danger')
+        return redirect(url_for('import_holdings_file'))
+    flash(f'Imported {result.imported} holdings', 'success' if not result.failed else 'warning')
+    return render_template("holdings_import.html", result=result)
+
+# -------------------------------
+# Holdings export – streamed CSV with current valuations (?lots=1 for one row per lot)
+@app.route('/holdings/export.csv')
+@login_required
+def export_holdings():
+    prices = _holding_prices(load_holdings(current_user.id)["price_symbol"])
+    aggregated = request.args.get('lots') != '1'
+    response = app.response_class(stream_with_context(export_csv(current_user.id, prices, aggregated)),
+                                  mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=holdings.csv'
+    return response
+
+# -------------------------------
+# "Share Page" Route – cached live price plus stored symbol metadata and indicators
 @app.route('/share/<symbol>')
 @login_required
 def share(symbol):
+    price = get_price(symbol)
+    if price == 'N/A':
+        price = history_store.last_close(symbol) or 'N/A'
     try:
-        ticker = yf.Ticker(symbol)
-        fast_info = ticker.fast_info
-        price = fast_info.get('last_price')
-        if price is None:
-            info = ticker.info
-            price = info.get('regularMarketPrice') or info.get('currentPrice') or info.get('previousClose', 'N/A')
-        asset = {
-            'symbol': symbol,
-            'name': ticker.info.get('longName', symbol),
-            'price': price if price is not None else 'N/A'
-        }
+        metadata = get_metadata(symbol)
     except Exception as e:
-        logger.error(f"Error in share route for {symbol}: {e}")
-        asset = {'symbol': symbol, 'name': symbol, 'price': 'N/A'}
-    return render_template("share.html", asset=asset)
+        logger.error(f"Error loading metadata for {symbol}: {e}")
+        metadata = {'long_name': symbol}
+    asset = dict(metadata, symbol=symbol, name=metadata['long_name'], price=price)
+    return render_template("share.html", asset=asset, stats=load_stats([symbol]).get(symbol))
+
+# -------------------------------
+# Chart responses are revalidated with their ETag/Last-Modified instead of re-sent
+def _chart_response(chart):
+    response = app.response_class(chart.png, mimetype='image/png')
+    response.set_etag(chart.etag)
+    response.last_modified = chart.last_modified
+    response.cache_control.private = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
 
 # -------------------------------
-# Graph Route – generate and serve a PNG graph (last 1 month trend)
+# Graph Route – serve a cached PNG graph (default last 1 month trend)
+# Use ?period=1mo|3mo|6mo|1y, and ?format=json for the raw series instead of an image.
 @app.route('/graph/<symbol>')
 @login_required
 def graph(symbol):
+    period = request.args.get('period', '1mo')
+    if period not in PERIODS:
+        return "Unsupported period", 400
     try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period="1mo")
-        if hist.empty:
+        bars = history_store.recent(symbol, days=PERIODS[period])
+        if len(bars) == 0:
             logger.error(f"No historical data available for {symbol}")
             return "No historical data available for graph."
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.plot(hist.index, hist['Close'], marker='o', linestyle='-')
-        ax.set_title(f'{symbol} Price Trend (Last 1 Month)')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Price (Rs)')
-        ax.grid(True)
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        buf.seek(0)
-        plt.close(fig)
-        return send_file(buf, mimetype='image/png')
+        if request.args.get('format') == 'json':
+            return jsonify(symbol=symbol, period=period,
+                           t=bars['ts'].tolist(), close=bars['close'].round(4).tolist())
+
+        chart = chart_cache.get_or_render(
+            (symbol, period, history_store.version(symbol)),
+            lambda: run_blocking(render_line_chart, bars['ts'].astype('datetime64[s]'), bars['close'],
+                                 f'{symbol} Price Trend ({PERIOD_LABELS[period]})', 'Date', 'Price (Rs)'),
+            last_modified=history_store.modified(symbol),
+        )
+        return _chart_response(chart)
     except Exception as e:
         logger.error(f"Error generating graph for {symbol}: {e}")
         return "Error generating graph"
 
+# -------------------------------
+# Portfolio Performance Route – daily value snapshots of the user's portfolio
+# Use ?period=1mo|3mo|6mo|1y, and ?format=json for the raw series instead of an image.
+@app.route('/portfolio/graph')
+@login_required
+def portfolio_graph():
+    period = request.args.get('period', '3mo')
+    if period not in PERIODS:
+        return "Unsupported period", 400
+    snapshots = load_snapshots(current_user.id, PERIODS[period])
+    if request.args.get('format') == 'json':
+        return jsonify(period=period, day=[s.day.isoformat() for s in snapshots],
+                       market_value=[round(s.market_value, 2) for s in snapshots],
+                       cost=[round(s.cost, 2) for s in snapshots])
+    if not snapshots:
+        return "No portfolio history available yet.", 404
+
+    last = snapshots[-1]
+    chart = chart_cache.get_or_render(
+        ('portfolio', current_user.id, period, len(snapshots), last.day, last.market_value),
+        lambda: run_blocking(render_line_chart, [s.day for s in snapshots], [s.market_value for s in snapshots],
+                             f'Portfolio Value ({PERIOD_LABELS[period]})', 'Date', 'Value (Rs)'),
+    )
+    return _chart_response(chart)
+
+# -------------------------------
+# JSON Quote API – batched snapshot of cached live prices
+# e.g. /api/quotes?symbols=RELIANCE.NS,TCS.NS (unavailable prices are null)
+def _requested_symbols():
+    symbols = [s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    return list(dict.fromkeys(symbols))[:MAX_QUOTE_SYMBOLS]
+
+@app.route('/api/quotes')
+@login_required
+def api_quotes():
+    symbols = _requested_symbols()
+    if not symbols:
+        return jsonify(error="symbols parameter is required"), 400
+    prices = get_prices(symbols)
+    return jsonify(as_of=time.time(), quotes={s: (None if p == 'N/A' else p) for s, p in prices.items()})
+
+# -------------------------------
+# Symbol Search – autocomplete over the symbol registry (symbol and company name)
+# e.g. /api/search?q=tata&limit=10
+@app.route('/api/search')
+@login_required
+def api_search():
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    asset_class = request.args.get('asset_class')
+    results = get_registry().search(query, limit=limit, asset_class=asset_class)
+    return jsonify(query=query, results=[entry.to_dict() for entry in results])
+
+# -------------------------------
+# Quote Stream – Server-Sent Events fed by one shared poller for all streamed symbols
+# First event is a full snapshot, later events carry only changed prices.
+@app.route('/api/quotes/stream')
+@login_required
+def api_quotes_stream():
+    symbols = _requested_symbols()
+    if not symbols:
+        return jsonify(error="symbols parameter is required"), 400
+    try:
+        q = quote_hub.subscribe(symbols, owner=current_user.id)
+    except SubscriptionLimitError as e:
+        return jsonify(error=str(e)), 429
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = q.get(timeout=QUOTE_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                message['quotes'] = {s: (None if p == 'N/A' else p) for s, p in message['quotes'].items()}
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            quote_hub.unsubscribe(q)
+
+    response = app.response_class(events(), mimetype='text/event-stream')
+    # Also unsubscribes when the client disconnects before the first event
+    response.call_on_close(lambda: quote_hub.unsubscribe(q))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # disable proxy buffering (nginx)
+    return response
+
 # -------------------------------
 # Logout Route
 @app.route('/logout')
 @login_required
 def logout():
+    user_cache.discard(current_user.id)
     logout_user()
     flash('Logged out', 'success')
     return redirect(url_for('login'))
@@ -0,0 +1,103 @@
+"""
+Concurrent write load test for the SQLite database layer.
+
+Runs the same mixed workload (register, add_holding, add_favorite_post writes plus
+holdings reads) against a fresh database twice: once with SQLAlchemy's defaults
+(NullPool, rollback journal, no pragmas) and once with the settings from db_config.
+Prints throughput and lock errors for each as JSON.
+
+    python benchmarks/db_write_load.py --threads 16 --ops 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_config  # noqa: E402
+from models import db, User, Favorite, Holding  # noqa: E402
+
+
+def make_engine(path, tuned):
+    uri = f"sqlite:///{path}"
+    if tuned:
+        if not event.contains(Engine, 'connect', db_config._on_connect):
+            event.listen(Engine, 'connect', db_config._on_connect)
+        return create_engine(uri, **db_config.engine_options(uri))
+    if event.contains(Engine, 'connect', db_config._on_connect):
+        event.remove(Engine, 'connect', db_config._on_connect)
+    return create_engine(uri)
+
+
+def worker(Session, worker_id, ops, counters, lock):
+    ok = errors = 0
+    for i in range(ops):
+        session = Session()
+        try:
+            kind = i % 4
+            if kind == 0:
+                session.add(User(username=f"user-{worker_id}-{i}", password="x"))
+            elif kind == 1:
+                session.add(Holding(asset_type="share", asset_symbol=f"SYM{i % 20}.NS",
+                                    quantity=1.0, purchase_price=100.0, user_id=worker_id + 1))
+            elif kind == 2:
+                session.add(Favorite(stock_symbol=f"FAV{i}.NS", user_id=worker_id + 1))
+            else:
+                session.execute(select(Holding).where(Holding.user_id == worker_id + 1)).all()
+            session.commit()
+            ok += 1
+        except OperationalError:
+            session.rollback()
+            errors += 1
+        finally:
+            session.close()
+    with lock:
+        counters['ok'] += ok
+        counters['errors'] += errors
+
+
+def run(tuned, threads, ops):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "load.db"), tuned)
+        db.Model.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert(), [{'id': n + 1, 'username': f"owner-{n}", 'password': "x"}
+                                                   for n in range(threads)])
+        Session = sessionmaker(bind=engine)
+        counters = {'ok': 0, 'errors': 0}
+        lock = threading.Lock()
+        pool = [threading.Thread(target=worker, args=(Session, n, ops, counters, lock)) for n in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    return {
+        'mode': 'tuned' if tuned else 'baseline',
+        'threads': threads,
+        'ops': threads * ops,
+        'succeeded': counters['ok'],
+        'lock_errors': counters['errors'],
+        'seconds': round(elapsed, 3),
+        'ops_per_second': round(counters['ok'] / elapsed, 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=200, help="operations per thread")
+    args = parser.parse_args()
+    results = [run(False, args.threads, args.ops), run(True, args.threads, args.ops)]
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,117 @@
+"""
+Deterministic in-process stand-in for the parts of yfinance the app uses.
+
+Prices follow a seeded random walk per symbol, so every run sees the same data.
+Each upstream call sleeps for `latency` (+/- `jitter`) seconds and fails with a
+connection error with probability `failure_rate`. Ticker calls for symbols in
+`unknown_symbols` fail like yfinance does for a delisted or mistyped ticker.
+Install it with upstream.gateway.set_provider().
+"""
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+
+class FakeUpstreamError(ConnectionError):
+    pass
+
+
+class FakeSymbolError(KeyError):
+    pass
+
+
+class _FastInfo(dict):
+    pass
+
+
+class FakeTicker:
+    def __init__(self, provider, symbol):
+        self._provider = provider
+        self.symbol = symbol
+
+    def _check_symbol(self):
+        if self.symbol in self._provider.unknown_symbols:
+            raise FakeSymbolError(f"{self.symbol}: No data found, symbol may be delisted")
+
+    @property
+    def fast_info(self):
+        self._provider._call('fast_info')
+        self._check_symbol()
+        return _FastInfo(last_price=float(self._provider.series(self.symbol)[-1]))
+
+    @property
+    def info(self):
+        self._provider._call('info')
+        self._check_symbol()
+        return {
+            'longName': f"{self.symbol.split('.')[0].title()} Limited",
+            'exchange': 'NSI' if self.symbol.endswith('.NS') else 'CCY',
+            'currency': 'INR',
+            'sector': 'Benchmarks',
+            'regularMarketPrice': float(self._provider.series(self.symbol)[-1]),
+        }
+
+    def history(self, period=None, start=None, **kwargs):
+        self._provider._call('history')
+        self._check_symbol()
+        return self._provider.frame(self.symbol, period=period, start=start)
+
+
+class FakeYFinance:
+    """
+    Provider object with yfinance's Ticker(symbol) and download(tickers, ...) API.
+    """
+
+    DAYS = 400  # length of every symbol's generated daily history
+
+    def __init__(self, latency=0.05, jitter=0.0, failure_rate=0.0, seed=42, unknown_symbols=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.unknown_symbols = set(unknown_symbols)
+        self.calls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._index = pd.bdate_range(end=pd.Timestamp('2024-06-28'), periods=self.DAYS)
+
+    def _call(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            fail = self._random.random() < self.failure_rate
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise FakeUpstreamError(f"fake {endpoint} failure")
+
+    def series(self, symbol):
+        rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+        start = 50 + rng.random() * 2000
+        return start * np.exp(np.cumsum(rng.normal(0, 0.01, self.DAYS)))
+
+    def frame(self, symbol, period=None, start=None):
+        close = self.series(symbol)
+        frame = pd.DataFrame({
+            'Open': close * 0.995,
+            'High': close * 1.01,
+            'Low': close * 0.99,
+            'Close': close,
+            'Volume': np.full(self.DAYS, 1e6),
+        }, index=self._index)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        days = {'1d': 1, '5d': 5, '1mo': 22, '3mo': 66, '6mo': 130, '1y': 252}.get(period, self.DAYS)
+        return frame.iloc[-days:]
+
+    def Ticker(self, symbol):
+        return FakeTicker(self, symbol)
+
+    def download(self, tickers, period=None, start=None, group_by='ticker', **kwargs):
+        self._call('download')
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        return pd.concat({t: self.frame(t, period=period, start=start) for t in tickers}, axis=1)
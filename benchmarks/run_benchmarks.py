@@ -0,0 +1,275 @@
+"""
+Benchmark and load-test suite for the app, run against a deterministic fake upstream.
+
+Runs microbenchmarks for the price engine, the CSV-backed list routes, holdings
+valuation and graph rendering, then a multi-user load scenario against the Flask
+app. Results are written as JSON; pass --compare to diff against a previous run.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json --threshold 20
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_yfinance import FakeYFinance  # noqa: E402
+
+
+def summarize(name, samples, **extra):
+    samples_ms = np.asarray(samples) * 1000
+    result = {
+        'name': name,
+        'n': len(samples),
+        'mean_ms': round(float(samples_ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(samples_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(samples_ms, 99)), 3),
+        'min_ms': round(float(samples_ms.min()), 3),
+    }
+    result.update(extra)
+    return result
+
+
+def bench(name, fn, repeat, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(name, samples)
+
+
+# -------------------------------
+# Environment
+def setup_environment(workdir, fake):
+    """
+    Point the app at a throwaway database, history store and market data file,
+    install the fake upstream and import the app. Returns the app module.
+    """
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'HISTORY_STORE_DIR': os.path.join(workdir, 'history'),
+        'MARKET_DATA_SCHEDULER': '0',
+        'PRICE_CACHE_BACKEND': 'memory',
+    })
+    shutil.copy(os.path.join(ROOT, 'contact.txt'), workdir)
+    os.chdir(workdir)
+
+    import upstream
+    upstream.gateway.set_provider(fake)  # production rate limit and breaker stay in place
+
+    import update_market_data
+    update_market_data.update_market_data()
+
+    import app
+    return app
+
+
+def login_client(app_module, username, symbols):
+    client = app_module.app.test_client()
+    client.post('/register', data={'username': username, 'password': 'bench'})
+    for i, symbol in enumerate(symbols):
+        client.post('/holdings', data={'asset_type': 'share', 'asset_symbol': symbol,
+                                       'quantity': str(1 + i % 5), 'purchase_price': '100'})
+    return client
+
+
+# -------------------------------
+# Microbenchmarks
+def run_micro(app_module, fake, repeat):
+    import price_engine
+    from charts import render_line_chart
+    from symbols import nifty_50_symbols
+    from valuation import frame_from_rows, value_positions, summarize as summarize_portfolio
+
+    results = []
+    symbols = nifty_50_symbols[:40]
+
+    def clear_cache():
+        for symbol in symbols:
+            price_engine.price_cache.delete(symbol)
+
+    results.append(bench('get_price.cold', lambda: price_engine.get_price('TCS.NS'), repeat,
+                         before=lambda: price_engine.price_cache.delete('TCS.NS')))
+    results.append(bench('get_price.warm', lambda: price_engine.get_price('TCS.NS'), repeat * 10))
+    results.append(bench('get_prices.cold_40', lambda: price_engine.get_prices(symbols), max(repeat // 5, 3),
+                         before=clear_cache))
+
+    client = login_client(app_module, 'bench-micro', symbols)
+    for path in ('/shares', '/shares?search=bank', '/commodities', '/currencies'):
+        results.append(bench(f'route{path}', lambda: client.get(path), repeat))
+
+    rows = [(1, 'share', symbols[i % len(symbols)], 1.0 + i % 7, 100.0) for i in range(5000)]
+    prices = price_engine.get_prices(symbols)
+    results.append(bench('valuation.5000_lots',
+                         lambda: summarize_portfolio(value_positions(frame_from_rows(rows), prices)), repeat))
+    results.append(bench('route/holdings.40_positions', lambda: client.get('/holdings'), repeat))
+
+    bars = app_module.history_store.recent('TCS.NS', days=31)
+    results.append(bench('graph.render_uncached',
+                         lambda: render_line_chart(bars['ts'].astype('datetime64[s]'), bars['close'],
+                                                   'TCS.NS', 'Date', 'Price (Rs)'), max(repeat // 5, 3)))
+    results.append(bench('route/graph.cached', lambda: client.get('/graph/TCS.NS'), repeat))
+    return results
+
+
+# -------------------------------
+# Load scenario
+LOAD_MIX = [
+    ('/shares', 3),
+    ('/holdings', 2),
+    ('/share/{symbol}', 2),
+    ('/graph/{symbol}', 2),
+    ('/api/quotes?symbols={symbol},INFY.NS', 1),
+    ('/currencies', 1),
+]
+
+
+def run_load(app_module, fake, users, duration, seed=7):
+    from symbols import nifty_50_symbols
+
+    clients = [login_client(app_module, f'bench-load-{n}', nifty_50_symbols[n % 10:n % 10 + 10])
+               for n in range(users)]
+    paths, weights = zip(*LOAD_MIX)
+    latencies = {path: [] for path in paths}
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def user(n, client):
+        rng = random.Random(seed + n)
+        local = {path: [] for path in paths}
+        failed = 0
+        while time.perf_counter() < stop_at:
+            template = rng.choices(paths, weights)[0]
+            path = template.format(symbol=rng.choice(nifty_50_symbols))
+            started = time.perf_counter()
+            response = client.get(path)
+            local[template].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                failed += 1
+        with lock:
+            for template, samples in local.items():
+                latencies[template].extend(samples)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=user, args=(n, c)) for n, c in enumerate(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    all_samples = [s for samples in latencies.values() for s in samples]
+    return {
+        'users': users,
+        'seconds': round(elapsed, 2),
+        'requests': len(all_samples),
+        'errors': errors[0],
+        'requests_per_second': round(len(all_samples) / elapsed, 1),
+        'overall': summarize('all', all_samples),
+        'routes': [summarize(template, samples) for template, samples in latencies.items() if samples],
+        'upstream_calls': dict(fake.calls),
+    }
+
+
+# -------------------------------
+# Reporting
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline, threshold):
+    """
+    Print metrics that got slower than threshold percent; return True if any did.
+    """
+    def index(report):
+        rows = {f"micro:{r['name']}": r for r in report.get('micro', [])}
+        load = report.get('load') or {}
+        rows.update({f"load:{r['name']}": r for r in load.get('routes', [])})
+        if load:
+            rows['load:all'] = load['overall']
+        return rows
+
+    old, new = index(baseline), index(current)
+    regressed = False
+    for name in sorted(set(old) & set(new)):
+        for metric in ('p50_ms', 'p95_ms'):
+            before, after = old[name][metric], new[name][metric]
+            if before > 0 and (after - before) / before * 100 > threshold:
+                regressed = True
+                print(f"REGRESSION {name} {metric}: {before:.3f} -> {after:.3f} ms", file=sys.stderr)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--latency', type=float, default=0.05, help="fake upstream latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=50, help="iterations per microbenchmark")
+    parser.add_argument('--users', type=int, default=20, help="concurrent users in the load scenario")
+    parser.add_argument('--duration', type=float, default=10, help="load scenario length in seconds")
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--output', help="write JSON results to this file (default: stdout)")
+    parser.add_argument('--compare', help="previous results file to check for regressions")
+    parser.add_argument('--threshold', type=float, default=20, help="allowed slowdown in percent")
+    args = parser.parse_args()
+
+    fake = FakeYFinance(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='vcc-bench-')
+    try:
+        app_module = setup_environment(workdir, fake)
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'config': vars(args),
+            },
+            'micro': run_micro(app_module, fake, args.repeat),
+            'load': None if args.skip_load else run_load(app_module, fake, args.users, args.duration),
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
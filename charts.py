@@ -0,0 +1,72 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Supported chart periods (query value -> calendar days of history)
+PERIODS = {
+    "1mo": 31,
+    "3mo": 92,
+    "6mo": 183,
+    "1y": 366,
+}
+PERIOD_LABELS = {
+    "1mo": "Last 1 Month",
+    "3mo": "Last 3 Months",
+    "6mo": "Last 6 Months",
+    "1y": "Last 1 Year",
+}
+
+
+def render_line_chart(x, y, title, xlabel, ylabel):
+    """
+    Draw a line chart on a standalone Agg canvas and return the PNG bytes.
+    Uses no pyplot global state, so it is safe to call from concurrent threads.
+    """
+    fig = Figure(figsize=(8, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(x, y, marker='o', linestyle='-')
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+    fig.autofmt_xdate()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+class Chart:
+    def __init__(self, png, last_modified):
+        self.png = png
+        self.etag = hashlib.md5(png).hexdigest()
+        self.last_modified = last_modified
+
+
+class ChartCache:
+    """
+    Bounded LRU of rendered charts keyed by (symbol, period, data version).
+    A new data version produces a new key, so stale charts simply age out.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._charts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render, last_modified=None):
+        with self._lock:
+            chart = self._charts.get(key)
+            if chart is not None:
+                self._charts.move_to_end(key)
+                return chart
+        chart = Chart(render(), last_modified)
+        with self._lock:
+            self._charts[key] = chart
+            while len(self._charts) > self.max_entries:
+                self._charts.popitem(last=False)
+        return chart
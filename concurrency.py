@@ -0,0 +1,38 @@
+import threading
+
+# Set inside run_blocking's pool threads, so nested calls run in place
+_local = threading.local()
+
+
+def gevent_active():
+    """
+    True when the process is serving on gevent (sockets monkey-patched by the
+    gunicorn gevent worker), where blocking I/O only suspends the current greenlet.
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def _run_offloaded(fn, args, kwargs):
+    _local.offloaded = True
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _local.offloaded = False
+
+
+def run_blocking(fn, *args, **kwargs):
+    """
+    Call fn(*args, **kwargs) and return its result. Under gevent it runs on the
+    hub's native thread pool, so CPU-bound work (chart rendering) and blocking C
+    calls (SQLite, see db_config.OffloadedConnection) do not stall the other
+    requests in the worker. Calls made from a pool thread run in place.
+    fn must not rely on the request or application context.
+    """
+    if not gevent_active() or getattr(_local, 'offloaded', False):
+        return fn(*args, **kwargs)
+    import gevent
+    return gevent.get_hub().threadpool.apply(_run_offloaded, (fn, args, kwargs))
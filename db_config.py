@@ -0,0 +1,120 @@
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from concurrency import run_blocking
+
+DEFAULT_DATABASE_URI = 'sqlite:///database/app.db'
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the single
+# writer; synchronous=NORMAL is durable in WAL mode except on power loss.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms to wait for the write lock instead of "database is locked"
+    'cache_size': -20000,  # KiB (about 20 MB) of page cache per connection
+    'mmap_size': 268435456,  # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+}
+
+
+class OffloadedCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor whose statements and fetches run through run_blocking.
+    """
+
+    def execute(self, *args):
+        return run_blocking(super().execute, *args)
+
+    def executemany(self, *args):
+        return run_blocking(super().executemany, *args)
+
+    def executescript(self, *args):
+        return run_blocking(super().executescript, *args)
+
+    def fetchone(self):
+        return run_blocking(super().fetchone)
+
+    def fetchmany(self, *args):
+        return run_blocking(super().fetchmany, *args)
+
+    def fetchall(self):
+        return run_blocking(super().fetchall)
+
+
+class OffloadedConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that runs every statement, fetch and commit through
+    run_blocking. Under gevent the sqlite3 driver never yields, so a query (or a
+    writer busy-waiting up to busy_timeout for the lock) would otherwise stall
+    every greenlet in the worker. Without gevent the calls run in place.
+    """
+
+    def cursor(self, factory=OffloadedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+    def commit(self):
+        return run_blocking(super().commit)
+
+    def rollback(self):
+        return run_blocking(super().rollback)
+
+
+def database_uri():
+    """
+    Database URI from DATABASE_URL (e.g. postgresql://...), defaulting to the local SQLite file.
+    """
+    return os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+
+
+def engine_options(uri):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS suited to the database behind uri.
+    Pool sizes can be tuned with DB_POOL_SIZE and DB_MAX_OVERFLOW.
+    """
+    pool_size = int(os.environ.get('DB_POOL_SIZE', 10))
+    max_overflow = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    if uri.startswith('sqlite'):
+        # Reuse connections (pragmas are applied once per connection) and share
+        # them between request threads.
+        return {
+            'poolclass': QueuePool,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'connect_args': {
+                'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+                'check_same_thread': False,
+
+            },
+        }
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=SQLITE_PRAGMAS):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_connection)
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+
+# Production server settings: gunicorn -c gunicorn.conf.py wsgi:app
+# Every value can be overridden through the environment variable next to it.
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# gevent (default): gunicorn monkey-patches the worker, so each request runs in a
+# greenlet and a request waiting on Yahoo (share, graph, holdings, quote streams)
+# holds a few KB instead of a thread. One worker serves up to worker_connections
+# requests at once. Work that blocks in C is moved to the hub's native thread pool
+# (concurrency.run_blocking): chart rendering, bulk imports and every SQLite
+# statement (db_config.OffloadedConnection), so a writer waiting on the database
+# lock does not stall the other requests. A server database (DATABASE_URL) needs
+# a gevent-cooperative driver; psycopg2 is patched with psycogreen in post_fork.
+# Use "gthread" with THREADS if gevent is not installed, or to use the sampling
+# profiler (PROFILING_ENABLED), which samples native threads only.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+threads = int(os.environ.get('THREADS', 8))  # gthread only
+# Native threads for run_blocking per gevent worker; bounds concurrent SQLite work
+threadpool_size = int(os.environ.get('THREADPOOL_SIZE', 32))
+
+# Processes for CPU-bound work (pandas valuation, template rendering). Each worker
+# keeps its own in-memory caches; the market data refresh runs in one worker at a
+# time (file lock), so extra workers do not add upstream load.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count(), 4)))
+
+# The app starts its scheduler and thread pools at import time, so it must be
+# loaded in each worker after the fork.
+preload_app = False
+
+# Heartbeat timeout; quote streams send a keepalive every 20s and are not affected.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# Related app settings for a worker serving many concurrent requests:
+#   UPSTREAM_MAX_WORKERS  in-flight Yahoo calls per worker (default 16)
+#   UPSTREAM_RATE/BURST   Yahoo request rate limit per worker (default 5/s, burst 10)
+#   DB_POOL_SIZE/DB_MAX_OVERFLOW  database connections per worker (default 10 + 20)
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    import gevent
+    gevent.get_hub().threadpool.maxsize = threadpool_size
+    if os.environ.get('DATABASE_URL', '').startswith('postgresql'):
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning("psycogreen is not installed; psycopg2 queries will block the gevent worker")
+            return
+        patch_psycopg()
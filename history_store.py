@@ -0,0 +1,273 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from upstream import gateway
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.environ.get(
+    'HISTORY_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'history'),
+)
+
+# One row per daily bar; ts is the bar date as seconds since the epoch (midnight)
+BAR_DTYPE = np.dtype([
+    ('ts', 'i8'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+])
+
+BACKFILL_PERIOD = "1y"
+SYNC_TTL = 3600  # seconds before a symbol's file is considered due for a sync
+FAILED_SYNC_TTL = 900  # seconds before a symbol whose backfill found no bars is tried again
+MAX_FAILED_SYNCS = 10000
+MAX_OPEN_MAPS = 128  # memory-mapped files kept open (each holds a file descriptor)
+DAY = 86400
+
+
+def _frame_to_bars(frame):
+    """
+    Convert a yfinance OHLCV DataFrame into a BAR_DTYPE array (NaN closes dropped).
+    """
+    frame = frame.dropna(subset=["Close"])
+    index = frame.index
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    bars = np.empty(len(frame), dtype=BAR_DTYPE)
+    bars['ts'] = index.normalize().values.astype('datetime64[s]').astype('i8')
+    bars['open'] = frame["Open"].to_numpy(dtype='f8')
+    bars['high'] = frame["High"].to_numpy(dtype='f8')
+    bars['low'] = frame["Low"].to_numpy(dtype='f8')
+    bars['close'] = frame["Close"].to_numpy(dtype='f8')
+    bars['volume'] = frame["Volume"].to_numpy(dtype='f8')
+    return bars
+
+
+class HistoryStore:
+    """
+    Daily price history stored as one NumPy .npy file per symbol.
+    Files are memory-mapped read-only and the mapping is reused until the file
+    changes, so reads are zero-copy slices. Syncs only download the bars from the
+    last stored date onwards (the last bar is re-fetched in case it was partial)
+    and replace the file atomically. Stored symbols are kept up to date by the
+    scheduler (sync_many); reads only call Yahoo to backfill a symbol never stored.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, sync_ttl=SYNC_TTL, failed_sync_ttl=FAILED_SYNC_TTL,
+                 max_open_maps=MAX_OPEN_MAPS):
+        self.root = root
+        self.sync_ttl = sync_ttl
+        self.failed_sync_ttl = failed_sync_ttl
+        self.max_open_maps = max_open_maps
+        self._maps = OrderedDict()  # symbol -> (file key, memmap), least recently used first
+        self._lock = threading.Lock()
+        self._backfills = {}  # symbol -> Event set when its in-flight backfill ends
+        self._failed = {}  # symbol -> monotonic time of its last backfill that found no bars
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.root, quote(symbol, safe='') + '.npy')
+
+    # -------------------------------
+    # Reads
+    def bars(self, symbol):
+        """
+        Return all stored bars for symbol as a read-only memmap (empty array if none).
+        At most max_open_maps mappings are kept; the least recently used is dropped.
+        """
+        path = self._path(symbol)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return np.empty(0, dtype=BAR_DTYPE)
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._maps.get(symbol)
+            if cached is not None and cached[0] == key:
+                self._maps.move_to_end(symbol)
+                return cached[1]
+            bars = np.load(path, mmap_mode='r')
+            self._maps[symbol] = (key, bars)
+            self._maps.move_to_end(symbol)
+            while len(self._maps) > self.max_open_maps:
+                self._maps.popitem(last=False)
+        return bars
+
+    def window(self, symbol, days):
+        """
+        Bars from the last `days` calendar days, as a view into the memmap.
+        """
+        bars = self.bars(symbol)
+        if len(bars) == 0:
+            return bars
+        start = bars['ts'][-1] - days * DAY
+        return bars[np.searchsorted(bars['ts'], start, side='right'):]
+
+    def symbols(self):
+        """
+        Every symbol with stored bars.
+        """
+        return [unquote(name[:-len('.npy')]) for name in os.listdir(self.root)
+                if name.endswith('.npy') and not name.startswith('.')]
+
+    def last_close(self, symbol):
+        bars = self.bars(symbol)
+        return float(bars['close'][-1]) if len(bars) else None
+
+    def modified(self, symbol):
+        """
+        Modification time of the symbol's stored bars as a datetime (None if absent).
+        """
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(self._path(symbol)), tz=timezone.utc)
+        except OSError:
+            return None
+
+    def version(self, symbol):
+        """
+        Token that changes whenever the symbol's stored bars change.
+        """
+        try:
+            st = os.stat(self._path(symbol))
+        except OSError:
+            return "empty"
+        return f"{st.st_ino}-{st.st_mtime_ns}-{st.st_size}"
+
+    # -------------------------------
+    # Writes
+    def _age(self, symbol):
+        try:
+            return time.time() - os.path.getmtime(self._path(symbol))
+        except OSError:
+            return None
+
+    def is_due(self, symbol):
+        age = self._age(symbol)
+        return age is None or age >= self.sync_ttl
+
+    def _start_for(self, symbol):
+        bars = self.bars(symbol)
+        if len(bars) == 0:
+            return None
+        return pd.Timestamp(int(bars['ts'][-1]), unit='s').strftime("%Y-%m-%d")
+
+    def append(self, symbol, new_bars):
+        """
+        Merge new_bars into the stored file, replacing any stored bars on or after
+        the first new date. An empty new_bars leaves the file untouched: a sync from
+        the last stored date always returns that bar, so no rows means the fetch
+        failed (yfinance's download reports per-ticker failures as NaN rows) and the
+        symbol must stay due.
+        """
+        path = self._path(symbol)
+        if len(new_bars) == 0:
+            return
+        existing = self.bars(symbol)
+        keep = existing[:np.searchsorted(existing['ts'], new_bars['ts'][0], side='left')]
+        merged = np.concatenate([keep, new_bars])
+        fd, tmp_path = tempfile.mkstemp(prefix=".history.", suffix=".tmp", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, merged)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def sync(self, symbol):
+        """
+        Fetch missing bars for one symbol from Yahoo. Returns True if the symbol
+        has stored bars afterwards.
+        """
+        start = self._start_for(symbol)
+        try:
+            if start is None:
+                hist = gateway.history(symbol, period=BACKFILL_PERIOD)
+            else:
+                hist = gateway.history(symbol, start=start)
+            self.append(symbol, _frame_to_bars(hist))
+        except Exception as e:
+            logger.error(f"Error syncing price history for {symbol}: {e}")
+        return os.path.exists(self._path(symbol))
+
+    def sync_many(self, symbols):
+        """
+        Fetch missing bars for many symbols, one batched download per start date.
+        Symbols synced within sync_ttl are skipped.
+        """
+        groups = {}
+        for symbol in symbols:
+            if self.is_due(symbol):
+                groups.setdefault(self._start_for(symbol), []).append(symbol)
+        for start, group in groups.items():
+            try:
+                kwargs = {"period": BACKFILL_PERIOD} if start is None else {"start": start}
+                data = gateway.download(group, interval="1d", group_by='ticker',
+                                        auto_adjust=True, threads=True, progress=False, **kwargs)
+            except Exception as e:
+                logger.error(f"Error downloading price history for {len(group)} symbols: {e}")
+                continue
+            for symbol in group:
+                try:
+                    frame = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+                    self.append(symbol, _frame_to_bars(frame))
+                except Exception as e:
+                    logger.error(f"Error storing price history for {symbol}: {e}")
+        logger.info(f"Price history synced for {sum(len(g) for g in groups.values())} symbols")
+
+    def _recently_failed(self, symbol):
+        failed_at = self._failed.get(symbol)
+        return failed_at is not None and time.monotonic() - failed_at < self.failed_sync_ttl
+
+    def _record_failure(self, symbol):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failed) >= MAX_FAILED_SYNCS:
+                self._failed = {s: t for s, t in self._failed.items() if now - t < self.failed_sync_ttl}
+                if len(self._failed) >= MAX_FAILED_SYNCS:
+                    self._failed.clear()
+            self._failed[symbol] = now
+
+    def backfill(self, symbol):
+        """
+        Download a symbol's history if none is stored, once across concurrent
+        callers. A symbol that yields no bars is not tried again for
+        failed_sync_ttl seconds.
+        """
+        if os.path.exists(self._path(symbol)) or self._recently_failed(symbol):
+            return
+        with self._lock:
+            done = self._backfills.get(symbol)
+            leader = done is None
+            if leader:
+                done = self._backfills[symbol] = threading.Event()
+        if not leader:
+            done.wait(timeout=gateway.timeouts['history'])
+            return
+        try:
+            if not self.sync(symbol):
+                self._record_failure(symbol)
+        finally:
+            with self._lock:
+                del self._backfills[symbol]
+            done.set()
+
+    def recent(self, symbol, days):
+        """
+        Bars from the last `days` days. Stored bars are served as they are (the
+        scheduler keeps them fresh); a symbol with no stored bars is backfilled first.
+        """
+        self.backfill(symbol)
+        return self.window(symbol, days)
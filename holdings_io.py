@@ -0,0 +1,218 @@
+import codecs
+import csv
+import io
+import logging
+import math
+from itertools import islice
+
+from models import db, Holding, apply_lots
+from valuation import holdings_query, frame_from_rows, value_positions
+
+logger = logging.getLogger(__name__)
+
+ASSET_TYPES = ("share", "commodity", "currency")
+IMPORT_CHUNK_SIZE = 500
+MAX_IMPORT_ROWS = 100000
+MAX_REPORTED_ERRORS = 1000
+EXPORT_BATCH_SIZE = 500
+
+# Accepted header spellings (lowercased, spaces as underscores) -> column
+HEADER_ALIASES = {
+    "asset_type": "asset_type", "type": "asset_type",
+    "asset_symbol": "asset_symbol", "symbol": "asset_symbol", "ticker": "asset_symbol",
+    "quantity": "quantity", "qty": "quantity", "units": "quantity",
+    "purchase_price": "purchase_price", "price": "purchase_price", "avg_price": "purchase_price",
+    "buy_price": "purchase_price",
+}
+
+EXPORT_COLUMNS = ["asset_type", "asset_symbol", "quantity", "purchase_price", "current_price",
+                  "cost", "market_value", "profit_loss", "profit_loss_pct"]
+
+
+class ImportFileError(Exception):
+    """Raised when an uploaded holdings file cannot be read at all."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+# -------------------------------
+# Validation
+def _number(value, field):
+    if isinstance(value, str):
+        value = value.strip().replace(",", "")
+    if value is None or value == "":
+        raise ValueError(f"{field} is required")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number, got {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} must be a finite number")
+    return number
+
+
+def validate_lot(row):
+    """
+    Validate one lot given as a mapping with asset_type, asset_symbol, quantity and
+    purchase_price (strings or numbers). asset_type defaults to share when blank.
+    Returns a clean dict or raises ValueError.
+    """
+    asset_type = str(row.get("asset_type") or "share").strip().lower()
+    if asset_type not in ASSET_TYPES:
+        raise ValueError(f"asset_type must be one of {', '.join(ASSET_TYPES)}")
+    asset_symbol = str(row.get("asset_symbol") or "").strip().upper()
+    if not asset_symbol:
+        raise ValueError("asset_symbol is required")
+    if len(asset_symbol) > Holding.__table__.c.asset_symbol.type.length:
+        raise ValueError("asset_symbol is too long")
+    quantity = _number(row.get("quantity"), "quantity")
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+    purchase_price = _number(row.get("purchase_price"), "purchase_price")
+    if purchase_price < 0:
+        raise ValueError("purchase_price cannot be negative")
+    return {"asset_type": asset_type, "asset_symbol": asset_symbol,
+            "quantity": quantity, "purchase_price": purchase_price}
+
+
+# -------------------------------
+# Streaming readers: yield (line number, row mapping) without loading the whole file
+def _columns(header):
+    columns = [HEADER_ALIASES.get(str(name or "").strip().lower().replace(" ", "_")) for name in header]
+    missing = {"asset_symbol", "quantity", "purchase_price"} - set(columns)
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(sorted(missing))}")
+    return columns
+
+
+def _rows(header, rows, first_line):
+    columns = _columns(header)
+    for line, values in enumerate(rows, start=first_line):
+        if not any(value not in (None, "") for value in values):
+            continue  # blank line
+        yield line, {column: value for column, value in zip(columns, values) if column}
+
+
+def read_csv(stream):
+    reader = csv.reader(codecs.getreader("utf-8-sig")(stream, errors="replace"))
+    header = next(reader, None)
+    if header is None:
+        raise ImportFileError("The file is empty")
+    return _rows(header, reader, first_line=2)
+
+
+def read_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import needs the openpyxl package; upload a CSV instead")
+    try:
+        # read_only streams rows from the sheet XML instead of building the workbook in memory
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f"Could not open workbook: {e}")
+    rows = workbook.active.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError("The sheet is empty")
+    return _rows(header, rows, first_line=2)
+
+
+def read_lots(stream, filename):
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return read_xlsx(stream)
+    if filename.lower().endswith((".csv", ".txt")):
+        return read_csv(stream)
+    raise ImportFileError("Upload a .csv or .xlsx file")
+
+
+# -------------------------------
+# Import
+def _positions_delta(lots):
+    """
+    Collapse lots to one entry per position so apply_lots issues one upsert each.
+    """
+    totals = {}
+    for lot in lots:
+        key = (lot["user_id"], lot["asset_type"], lot["asset_symbol"])
+        quantity, cost = totals.get(key, (0.0, 0.0))
+        totals[key] = (quantity + lot["quantity"], cost + lot["quantity"] * lot["purchase_price"])
+    return [{"user_id": user_id, "asset_type": asset_type, "asset_symbol": asset_symbol,
+             "quantity": quantity, "purchase_price": cost / quantity}
+            for (user_id, asset_type, asset_symbol), (quantity, cost) in totals.items()]
+
+
+def import_holdings(user_id, stream, filename, engine=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Stream lots from an uploaded CSV/XLSX file, validate them a chunk at a time and
+    insert the valid ones with executemany (lots plus position upserts) in a single
+    transaction. Invalid rows are skipped and reported by line number.
+    Uses its own connection from engine (default db.engine), so it can run on a
+    worker thread. Raises ImportFileError if the file itself is unreadable.
+    """
+    result = ImportResult()
+    rows = read_lots(stream, filename)
+    engine = engine or db.engine
+    seen = 0
+    with engine.begin() as connection:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            seen += len(chunk)
+            if seen > MAX_IMPORT_ROWS:
+                raise ImportFileError(f"Files are limited to {MAX_IMPORT_ROWS} rows")
+            lots = []
+            for line, row in chunk:
+                try:
+                    lot = validate_lot(row)
+                except ValueError as e:
+                    result.add_error(line, str(e))
+                    continue
+                lot["user_id"] = user_id
+                lots.append(lot)
+            if lots:
+                # Core executemany skips the per-object after_insert hook; positions
+                # are updated here instead, in the same transaction.
+                connection.execute(Holding.__table__.insert(), lots)
+                apply_lots(connection, _positions_delta(lots))
+                result.imported += len(lots)
+    logger.info(f"Imported {result.imported} holdings for user {user_id} ({result.failed} rows rejected)")
+    return result
+
+
+# -------------------------------
+# Export
+def export_csv(user_id, prices, aggregated=True, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield the user's holdings with valuations as CSV text, one batch of rows at a
+    time, so the response is streamed rather than built in memory.
+    prices maps price symbols to the prices to value at.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    results = iter(holdings_query(user_id, aggregated).yield_per(batch_size))
+    while True:
+        batch = list(islice(results, batch_size))
+        if not batch:
+            break
+        valued = value_positions(frame_from_rows(batch), prices).round(
+            {"purchase_price": 4, "current_price": 4, "cost": 2, "market_value": 2, "profit_loss": 2, "profit_loss_pct": 2})
+        # Unavailable prices are written as empty cells
+        valued["current_price"] = valued["current_price"].astype(object).where(valued["current_price"].notna(), None)
+        writer.writerows(valued[EXPORT_COLUMNS].itertuples(index=False, name=None))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
@@ -1,3 +1,6 @@
-from app import db
-db.create_all()
+from app import app
+from migrations import migrate
+
+with app.app_context():
+    migrate()
 print("Database initialized.")
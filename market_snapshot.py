@@ -0,0 +1,114 @@
+import csv
+import logging
+import os
+import threading
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def _normalize_column(name):
+    # Accept both the lowercase app schema and the capitalized CLI schema.
+    return name.strip().lower().replace(" ", "_")
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return "N/A"
+
+
+class _State:
+    def __init__(self, key, records, by_symbol, by_class):
+        self.key = key
+        self.records = records
+        self.by_symbol = by_symbol
+        self.by_class = by_class
+
+
+class MarketSnapshot:
+    """
+    Process-wide, read-only view of market_data.csv.
+    The file is parsed once and indexed by symbol and asset class; it is only
+    re-read when its inode, mtime or size changes. Records are immutable mappings
+    shared by every request, so views must not modify them.
+    """
+
+    def __init__(self, path, asset_classes, names=None):
+        self.path = path
+        self._names = names or {}
+        self._class_of = {symbol: asset_class
+                          for asset_class, symbols in asset_classes.items()
+                          for symbol in symbols}
+        self._classes = tuple(asset_classes)
+        self._state = _State(None, (), MappingProxyType({}), MappingProxyType({}))
+        self._lock = threading.Lock()
+
+    def _file_key(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _current(self):
+        key = self._file_key()
+        state = self._state
+        if key == state.key:
+            return state
+        with self._lock:
+            if key != self._state.key:
+                self._state = self._load(key)
+            return self._state
+
+    def _load(self, key):
+        records = []
+        if key is None:
+            logger.error(f"Market data file {self.path} not found")
+        else:
+            try:
+                with open(self.path, newline="") as f:
+                    reader = csv.reader(f)
+                    columns = [_normalize_column(c) for c in next(reader, [])]
+                    for values in reader:
+                        row = dict(zip(columns, values))
+                        symbol = row.get("symbol")
+                        if not symbol:
+                            continue
+                        for field in NUMERIC_FIELDS:
+                            if field in row:
+                                row[field] = _parse_float(row[field])
+                        row["asset_class"] = row.get("asset_class") or self._class_of.get(symbol)
+                        row["price"] = row.get("close", "N/A")
+                        row["name"] = self._names.get(symbol, symbol)
+                        records.append(MappingProxyType(row))
+                logger.info(f"Loaded {len(records)} rows from {self.path}")
+            except Exception as e:
+                logger.error(f"Error reading {self.path}: {e}")
+                records = []
+
+        by_symbol = {r["symbol"]: r for r in records}
+        by_class = {}
+        for asset_class in self._classes:
+            by_class[asset_class] = tuple(r for r in records if r["asset_class"] == asset_class)
+        return _State(key, tuple(records), MappingProxyType(by_symbol), MappingProxyType(by_class))
+
+    @property
+    def version(self):
+        """
+        Opaque token that changes whenever the underlying file changes.
+        """
+        key = self._current().key
+        return "-".join(str(part) for part in key) if key else "missing"
+
+    def records(self, asset_class=None):
+        state = self._current()
+        if asset_class is None:
+            return state.records
+        return state.by_class.get(asset_class, ())
+
+    def get(self, symbol):
+        return self._current().by_symbol.get(symbol)
@@ -0,0 +1,348 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds (Prometheus client defaults)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# -------------------------------
+# Metric types (Prometheus text exposition format)
+class _Metric:
+    """
+    Base for all metric types. Values are kept per tuple of label values, or
+    computed at scrape time by `callback`, which returns {label values tuple: value}
+    (or a single number for an unlabelled metric) from an existing source of truth.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def samples(self):
+        if self.callback is not None:
+            return self._collect()
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def _collect(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.error(f"Error collecting metric {self.name}: {e}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, key, (), value) for key, value in sorted(values.items()) if value is not None]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(c[0]), c[1], c[2])) for key, c in self._values.items())
+        samples = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append((f"{self.name}_bucket", key, (('le', _number(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry. Each gunicorn worker keeps its own, so scrape every worker
+# (or run a single worker per port) to see the whole picture.
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', "Time to build a response, by route.", ('endpoint', 'method', 'status'))
+REQUEST_PHASE_DURATION = registry.histogram(
+    'http_request_phase_duration_seconds',
+    "Time a request spent in a phase (sql, upstream, template), by route.", ('endpoint', 'phase'))
+REQUEST_SQL_QUERIES = registry.histogram(
+    'http_request_sql_queries', "SQL statements executed per request, by route.", ('endpoint',),
+    buckets=COUNT_BUCKETS)
+UPSTREAM_DURATION = registry.histogram(
+    'upstream_request_duration_seconds', "Upstream market-data call latency, by endpoint and outcome.",
+    ('endpoint', 'outcome'))
+
+
+# -------------------------------
+# Per-request phase accounting (thread-local, so background threads are not counted)
+_request = threading.local()
+
+
+def _state():
+    return getattr(_request, 'state', None)
+
+
+def add_phase(name, seconds):
+    state = _state()
+    if state is not None:
+        state['phases'][name] = state['phases'].get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the enclosed time to a phase of the current request. Nested phases
+    of the same name are counted once.
+    """
+    state = _state()
+    if state is None or name in state['active']:
+        yield
+        return
+    state['active'].add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        state['active'].discard(name)
+        add_phase(name, time.perf_counter() - started)
+
+
+def count_query():
+    state = _state()
+    if state is not None:
+        state['queries'] += 1
+
+
+# -------------------------------
+# Sampling profiler
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every `interval` seconds from a helper thread
+    and counts identical stacks. Output is in collapsed ("folded") format, one
+    "frame;frame;frame count" line per stack, ready for flamegraph tools.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005, max_depth=64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = _Tally()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stack(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+                self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+# -------------------------------
+# Flask integration
+def init_app(app, profiling=None):
+    """
+    Record per-route latency, SQL statement counts and phase timings for every
+    request, and serve the registry at /metrics.
+
+    With profiling enabled (PROFILING_ENABLED=1), adding ?_profile=1 to any URL
+    samples that request and returns the collapsed stacks instead of the page.
+    """
+    from flask import request, Response
+    from jinja2 import Template
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    if profiling is None:
+        profiling = os.environ.get('PROFILING_ENABLED', '0') == '1'
+
+    class TimedTemplate(Template):
+        def render(self, *args, **kwargs):
+            with phase('template'):
+                return super().render(*args, **kwargs)
+
+    app.jinja_env.template_class = TimedTemplate
+
+    # The start time lives on the execution context, so a statement that raises
+    # (and never reaches after_cursor_execute) leaves nothing behind on the connection.
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+        count_query()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        if started is not None:
+            add_phase('sql', time.perf_counter() - started)
+
+    @app.before_request
+    def _start_request():
+        _request.state = {'started': time.perf_counter(), 'phases': {}, 'active': set(), 'queries': 0}
+        if profiling and request.args.get('_profile') == '1':
+            _request.state['profiler'] = SamplingProfiler().start()
+
+    @app.after_request
+    def _finish_request(response):
+        state = _state()
+        if state is None:
+            return response
+        _request.state = None
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_DURATION.observe(time.perf_counter() - state['started'], endpoint=endpoint,
+                                 method=request.method, status=str(response.status_code))
+        REQUEST_SQL_QUERIES.observe(state['queries'], endpoint=endpoint)
+        for name, seconds in state['phases'].items():
+            REQUEST_PHASE_DURATION.observe(seconds, endpoint=endpoint, phase=name)
+
+        profiler = state.get('profiler')
+        if profiler is not None:
+            profiler.stop()
+            logger.info(f"Profiled {request.path}: {profiler.samples} samples")
+            return Response(profiler.folded(), mimetype='text/plain')
+        return response
+
+    @app.teardown_request
+    def _abandon_request(error=None):
+        # after_request does not run when a view raises; drop the state either way.
+        state = _state()
+        if state is not None and state.get('profiler') is not None:
+            state['profiler'].stop()
+        _request.state = None
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
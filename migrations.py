@@ -0,0 +1,83 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# Idempotent statements that bring databases created before a revision up to date.
+# New databases get the same indexes from db.create_all().
+MIGRATIONS = [
+    # Composite lookup index for holdings
+    "CREATE INDEX IF NOT EXISTS ix_holding_user_symbol ON holding (user_id, asset_symbol)",
+    # Drop duplicate favorites (keep the oldest) before enforcing uniqueness
+    "DELETE FROM favorite WHERE id NOT IN (SELECT MIN(id) FROM favorite GROUP BY user_id, stock_symbol)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_favorite_user_symbol ON favorite (user_id, stock_symbol)",
+]
+
+# Symbol columns widened from VARCHAR(10) to VARCHAR(32). SQLite does not enforce
+# lengths, so only server databases need the ALTER.
+SYMBOL_COLUMNS = [('holding', 'asset_symbol'), ('favorite', 'stock_symbol')]
+SYMBOL_LENGTH = 32
+WIDEN_COLUMN = {
+    'postgresql': "ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR({length})",
+}
+
+# Lots are stored upper-case (validate_lot); older rows may not be. Positions built
+# from lower-case lots are dropped and rebuilt per user by the backfill below.
+NORMALIZE_SYMBOLS = [
+    "DELETE FROM position WHERE user_id IN "
+    "(SELECT user_id FROM holding WHERE asset_symbol <> UPPER(asset_symbol))",
+    "UPDATE holding SET asset_symbol = UPPER(asset_symbol) WHERE asset_symbol <> UPPER(asset_symbol)",
+]
+
+# Users with lots but no positions get theirs built from the lots. Workers run this
+# concurrently at startup; rows another worker inserted first are kept.
+BACKFILL_POSITIONS = (
+    "INSERT INTO position (user_id, asset_type, asset_symbol, quantity, cost) "
+    "SELECT user_id, asset_type, asset_symbol, SUM(quantity), SUM(quantity * purchase_price) "
+    "FROM holding WHERE user_id NOT IN (SELECT user_id FROM position) "
+    "GROUP BY user_id, asset_type, asset_symbol "
+    "ON CONFLICT (user_id, asset_symbol, asset_type) DO NOTHING"
+)
+
+
+def _widen_symbol_columns(conn):
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        return
+    if dialect not in WIDEN_COLUMN:
+        raise NotImplementedError(f"Unsupported database dialect: {dialect}")
+    inspector = inspect(conn)
+    for table, column in SYMBOL_COLUMNS:
+        length = next(c['type'].length for c in inspector.get_columns(table) if c['name'] == column)
+        if length is not None and length < SYMBOL_LENGTH:
+            conn.execute(text(WIDEN_COLUMN[dialect].format(table=table, column=column, length=SYMBOL_LENGTH)))
+            logger.info(f"Widened {table}.{column} to VARCHAR({SYMBOL_LENGTH})")
+
+
+def migrate():
+    """
+    Create missing tables and apply schema revisions. Safe to run on every startup.
+    Must be called inside an application context.
+    """
+    db.create_all()
+    with db.engine.begin() as conn:
+        _widen_symbol_columns(conn)
+        for statement in MIGRATIONS:
+            conn.execute(text(statement))
+        for statement in NORMALIZE_SYMBOLS:
+            conn.execute(text(statement))
+        # Positions were added after holdings; build them from existing lots.
+        result = conn.execute(text(BACKFILL_POSITIONS))
+        if result.rowcount:
+            logger.info(f"Backfilled {result.rowcount} positions from existing holdings")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    from app import app
+    with app.app_context():
+        migrate()
+    print("Database migrated.")
@@ -1,8 +1,25 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 
 db = SQLAlchemy()
 
+
+INSERT_DIALECTS = {"postgresql": postgresql, "sqlite": sqlite}
+
+
+def dialect_insert(table, bind):
+    """
+    INSERT construct supporting ON CONFLICT clauses for the bind's dialect.
+    Raises NotImplementedError for databases other than SQLite and PostgreSQL.
+    """
+    dialect = INSERT_DIALECTS.get(bind.dialect.name)
+    if dialect is None:
+        raise NotImplementedError(f"Unsupported database dialect: {bind.dialect.name}")
+    return dialect.insert(table)
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(150), unique=True, nullable=False, index=True)
@@ -14,21 +31,143 @@ class User(UserMixin, db.Model):
         return f"<User {self.username}>"
 
 class Favorite(db.Model):
+    __table_args__ = (
+        db.Index('uq_favorite_user_symbol', 'user_id', 'stock_symbol', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    stock_symbol = db.Column(db.String(10), nullable=False)
+    stock_symbol = db.Column(db.String(32), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     def _repr_(self):
         return f"<Favorite {self.stock_symbol} for user_id {self.user_id}>"
 
 class Holding(db.Model):
+    __table_args__ = (
+        db.Index('ix_holding_user_symbol', 'user_id', 'asset_symbol'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     asset_type = db.Column(db.String(50), nullable=False)  # share, commodity, or currency
-    asset_symbol = db.Column(db.String(10), nullable=False)
+    asset_symbol = db.Column(db.String(32), nullable=False)
     quantity = db.Column(db.Float, nullable=False)
     purchase_price = db.Column(db.Float, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     def _repr_(self):
         return (f"<Holding {self.asset_type}: {self.asset_symbol} x {self.quantity} "
-                f"at Rs {self.purchase_price} for user_id {self.user_id}>")
\ No newline at end of file
+                f"at Rs {self.purchase_price} for user_id {self.user_id}>")
+
+class Position(db.Model):
+    """
+    Aggregated view of a user's lots per symbol, kept up to date on every Holding insert.
+    """
+    __table_args__ = (
+        db.Index('uq_position_user_symbol_type', 'user_id', 'asset_symbol', 'asset_type', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    asset_type = db.Column(db.String(50), nullable=False)
+    asset_symbol = db.Column(db.String(32), nullable=False)
+    quantity = db.Column(db.Float, nullable=False, default=0)
+    cost = db.Column(db.Float, nullable=False, default=0)  # total purchase cost in Rs
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    @property
+    def average_cost(self):
+        return self.cost / self.quantity if self.quantity else 0
+
+    def _repr_(self):
+        return (f"<Position {self.asset_type}: {self.asset_symbol} x {self.quantity} "
+                f"avg Rs {self.average_cost} for user_id {self.user_id}>")
+
+
+class SymbolMetadata(db.Model):
+    """
+    Slow-changing descriptive data per symbol, cached from Yahoo's info endpoint.
+    """
+    symbol = db.Column(db.String(32), primary_key=True)
+    long_name = db.Column(db.String(255))
+    exchange = db.Column(db.String(32))
+    currency = db.Column(db.String(8))
+    sector = db.Column(db.String(100))
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def _repr_(self):
+        return f"<SymbolMetadata {self.symbol}: {self.long_name}>"
+
+
+class SymbolStats(db.Model):
+    """
+    Precomputed indicators per symbol, maintained by analytics.update_symbol_stats.
+    as_of is the timestamp of the last daily bar included. The *_base columns hold
+    EMA state up to the bar before it, so a revised last bar can be folded in again.
+    """
+    symbol = db.Column(db.String(32), primary_key=True)
+    as_of = db.Column(db.BigInteger, nullable=False)
+    close = db.Column(db.Float)
+    sma_20 = db.Column(db.Float)
+    sma_50 = db.Column(db.Float)
+    sma_200 = db.Column(db.Float)
+    ema_12 = db.Column(db.Float)
+    ema_26 = db.Column(db.Float)
+    base_ts = db.Column(db.BigInteger)
+    ema_12_base = db.Column(db.Float)
+    ema_26_base = db.Column(db.Float)
+    return_1d = db.Column(db.Float)  # fractional returns over 1, 5 and 21 trading days
+    return_1w = db.Column(db.Float)
+    return_1m = db.Column(db.Float)
+    volatility_20 = db.Column(db.Float)  # annualized, from 20 daily log returns
+    high_52w = db.Column(db.Float)
+    low_52w = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def _repr_(self):
+        return f"<SymbolStats {self.symbol} as of {self.as_of}>"
+
+
+class PortfolioSnapshot(db.Model):
+    """
+    One row per user per day with the portfolio's total cost and market value in Rs,
+    written by portfolio_history.snapshot_portfolios after each market data refresh.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    cost = db.Column(db.Float, nullable=False)
+    market_value = db.Column(db.Float, nullable=False)
+    profit_loss = db.Column(db.Float, nullable=False)
+
+    def _repr_(self):
+        return f"<PortfolioSnapshot user_id {self.user_id} on {self.day}: Rs {self.market_value}>"
+
+
+def apply_lots(connection, lots):
+    """
+    Add lots (dicts with user_id, asset_type, asset_symbol, quantity, purchase_price)
+    to the aggregated positions with one upsert per lot, on the caller's connection.
+    """
+    if not lots:
+        return
+    stmt = dialect_insert(Position.__table__, connection)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'asset_symbol', 'asset_type'],
+        set_={
+            'quantity': Position.__table__.c.quantity + stmt.excluded.quantity,
+            'cost': Position.__table__.c.cost + stmt.excluded.cost,
+        },
+    )
+    connection.execute(stmt, [{
+        'user_id': lot['user_id'],
+        'asset_type': lot['asset_type'],
+        'asset_symbol': lot['asset_symbol'],
+        'quantity': lot['quantity'],
+        'cost': lot['quantity'] * lot['purchase_price'],
+    } for lot in lots])
+
+
+@event.listens_for(Holding, 'after_insert')
+def _update_position(mapper, connection, holding):
+    apply_lots(connection, [{
+        'user_id': holding.user_id,
+        'asset_type': holding.asset_type,
+        'asset_symbol': holding.asset_symbol,
+        'quantity': holding.quantity,
+        'purchase_price': holding.purchase_price,
+    }])
@@ -0,0 +1,75 @@
+import logging
+from datetime import date, timedelta
+
+from models import db, PortfolioSnapshot, dialect_insert
+from valuation import load_holdings, value_all_users
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_prices(symbols, market_snapshot, history_store, fetch=None):
+    """
+    Prices for symbols from the market data snapshot closes, falling back to the
+    last stored daily close and finally to fetch(remaining) (e.g. get_prices).
+    Symbols with no price at all are left out.
+    """
+    prices = {}
+    for symbol in symbols:
+        record = market_snapshot.get(symbol)
+        price = record.get("close") if record is not None else None
+        if not isinstance(price, float) or price != price:
+            price = history_store.last_close(symbol)
+        if price is not None:
+            prices[symbol] = price
+    remaining = [symbol for symbol in symbols if symbol not in prices]
+    if remaining and fetch is not None:
+        prices.update({s: p for s, p in fetch(remaining).items() if p != 'N/A'})
+    return prices
+
+
+def snapshot_portfolios(market_snapshot, history_store, fetch=None, day=None):
+    """
+    Value every user's positions in one vectorized pass and upsert one
+    PortfolioSnapshot row per user for day (default today). Positions without
+    any price are carried at cost. Must be called inside an application context.
+    Returns the number of portfolios written.
+    """
+    day = day or date.today()
+    frame = load_holdings()
+    if frame.empty:
+        return 0
+    prices = snapshot_prices(list(frame["price_symbol"].unique()), market_snapshot, history_store, fetch)
+    totals = value_all_users(prices, frame, unpriced_at_cost=True)
+    rows = [{
+        "user_id": int(user_id),
+        "day": day,
+        "cost": float(row.cost),
+        "market_value": float(row.market_value),
+        "profit_loss": float(row.profit_loss),
+    } for user_id, row in zip(totals.index, totals.itertuples(index=False))]
+
+    stmt = dialect_insert(PortfolioSnapshot.__table__, db.engine)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={column: getattr(stmt.excluded, column) for column in ("cost", "market_value", "profit_loss")},
+    )
+    db.session.execute(stmt, rows)
+    db.session.commit()
+    logger.info(f"Stored portfolio snapshots for {len(rows)} users")
+    return len(rows)
+
+
+def load_snapshots(user_id, days):
+    """
+    A user's snapshots from the last `days` days, oldest first. Reads a bounded
+    primary-key range, so the cost does not grow with the portfolio's age.
+    """
+    since = date.today() - timedelta(days=days)
+    return (PortfolioSnapshot.query
+            .filter(PortfolioSnapshot.user_id == user_id, PortfolioSnapshot.day >= since)
+            .order_by(PortfolioSnapshot.day)
+            .all())
+
+
+def has_snapshots(user_id):
+    return db.session.query(PortfolioSnapshot.query.filter_by(user_id=user_id).exists()).scalar()
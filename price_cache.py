@@ -0,0 +1,349 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from db_config import OffloadedConnection
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL = 300  # seconds
+DEFAULT_LEASE_TIMEOUT = 10  # seconds a worker may hold a fetch lease
+TOUCH_BATCH = 64  # cache hits recorded before their access times are written
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'price_cache.db')
+
+
+# -------------------------------
+# Backends: store (value, expires_at) pairs and enforce the size cap
+class MemoryBackend:
+    """
+    In-process LRU store. Each gunicorn worker keeps its own copy.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def acquire_lease(self, key, timeout):
+        # Single-process store: in-process single-flight is enough.
+        return True
+
+    def release_lease(self, key):
+        pass
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    Cross-worker store in a SQLite file, shared by every process on the host.
+    Hits are remembered in memory and their access times written in batches, on the
+    next set() or every TOUCH_BATCH hits, so reads rarely take the write lock. When
+    full, expired entries are dropped first, then the least recently accessed ones.
+    Also provides fetch leases so only one worker hits upstream per key.
+    """
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._local = threading.local()
+        self._touched = {}  # key -> last hit time, not yet written
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS price_cache ("
+                     "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                     "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_price_cache_accessed_at ON price_cache (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_price_cache_expires_at ON price_cache (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS price_cache_lease ("
+                     "key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, factory=OffloadedConnection)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires_at FROM price_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._touched[key] = time.time()
+            full = len(self._touched) >= TOUCH_BATCH
+        if full:
+            self._flush_touched(conn)
+        return json.loads(row[0]), row[1]
+
+    def _flush_touched(self, conn):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany("UPDATE price_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                             [(at, key) for key, at in touched.items()])
+
+    def set(self, key, value, expires_at):
+        conn = self._conn()
+        now = time.time()
+        self._flush_touched(conn)
+        conn.execute("INSERT OR REPLACE INTO price_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                     (key, json.dumps(value), expires_at, now))
+        if conn.execute("SELECT COUNT(*) FROM price_cache").fetchone()[0] <= self.max_entries:
+            return
+        evicted = conn.execute("DELETE FROM price_cache WHERE expires_at <= ?", (now,)).rowcount
+        evicted += conn.execute("DELETE FROM price_cache WHERE key IN ("
+                                "SELECT key FROM price_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                                (self.max_entries,)).rowcount
+        with self._lock:
+            self.evictions += max(evicted, 0)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM price_cache WHERE key = ?", (key,))
+
+    def acquire_lease(self, key, timeout):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM price_cache_lease WHERE key = ? AND expires_at < ?", (key, now))
+        cur = conn.execute("INSERT OR IGNORE INTO price_cache_lease (key, expires_at) VALUES (?, ?)",
+                           (key, now + timeout))
+        return cur.rowcount == 1
+
+    def release_lease(self, key):
+        self._conn().execute("DELETE FROM price_cache_lease WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM price_cache").fetchone()[0]
+
+
+def create_backend(name='memory', max_entries=DEFAULT_MAX_ENTRIES, path=None):
+    """
+    Build a cache backend by name ('memory' or 'sqlite').
+    """
+    if name == 'memory':
+        return MemoryBackend(max_entries=max_entries)
+    if name == 'sqlite':
+        return SQLiteBackend(path=path or DEFAULT_SQLITE_PATH, max_entries=max_entries)
+    raise ValueError(f"Unknown price cache backend: {name}")
+
+
+# -------------------------------
+# Cache front-end: TTL handling, single-flight fetches and counters
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class PriceCache:
+    """
+    Bounded TTL cache with single-flight deduplication of concurrent misses.
+    Concurrent callers missing on the same key share one fetch; with a backend that
+    supports leases, workers in other processes wait for that fetch as well.
+    """
+
+    def __init__(self, backend=None, ttl=DEFAULT_TTL, lease_timeout=DEFAULT_LEASE_TIMEOUT):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.lease_timeout = lease_timeout
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def get(self, key, default=None):
+        entry = self.backend.get(key)
+        if entry is not None and entry[1] > time.time():
+            self._count('hits')
+            return entry[0]
+        self._count('misses')
+        return default
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, time.time() + (self.ttl if ttl is None else ttl))
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Return the cached value for key, calling fetch(key) at most once across
+        concurrent callers on a miss. ttl may be a number or a callable of the value.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self.fetch(key, fetch, ttl)
+
+    def fetch(self, key, fetch, ttl=None):
+        """
+        Refill key after a miss. Joins an in-flight fetch of the same key if one exists.
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            self._count('coalesced')
+            return flight.wait()
+
+        try:
+            # A flight that finished between our miss and now may have filled the key.
+            entry = self.backend.get(key)
+            if entry is not None and entry[1] > time.time():
+                flight.value = entry[0]
+            else:
+                flight.value = self._fetch_shared(key, fetch, ttl)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+        return flight.value
+
+    def fetch_many(self, keys, fetch_many, ttl=None):
+        """
+        Refill several keys after misses with a single fetch_many(keys) call, which
+        returns a dict of key -> value. Keys already in flight are joined instead,
+        and keys another worker holds the lease for are waited on as in fetch().
+        Returns a dict of key -> value for every key.
+        """
+        flights, joined = {}, {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                flight = self._inflight.get(key)
+                if flight is None:
+                    flights[key] = self._inflight[key] = _Flight()
+                else:
+                    joined[key] = flight
+            self.coalesced += len(joined)
+
+        values = {}
+        try:
+            values.update(self._fetch_many_shared(list(flights), fetch_many, ttl))
+        except Exception as e:
+            for flight in flights.values():
+                flight.error = e
+            raise
+        finally:
+            with self._lock:
+                for key in flights:
+                    self._inflight.pop(key, None)
+            for key, flight in flights.items():
+                flight.value = values.get(key)
+                flight.event.set()
+        for key, flight in joined.items():
+            values[key] = flight.wait()
+        return values
+
+    def _fetch_many_shared(self, keys, fetch_many, ttl):
+        values, pending = {}, []
+        now = time.time()
+        for key in keys:
+            # A flight that finished between our miss and now may have filled the key.
+            entry = self.backend.get(key)
+            if entry is not None and entry[1] > now:
+                values[key] = entry[0]
+            else:
+                pending.append(key)
+        leased = [key for key in pending if self.backend.acquire_lease(key, self.lease_timeout)]
+        try:
+            if leased:
+                self._count('fetches', len(leased))
+                fetched = fetch_many(leased)
+                for key in leased:
+                    value = values[key] = fetched[key]
+                    self.set(key, value, ttl(value) if callable(ttl) else ttl)
+        finally:
+            for key in leased:
+                self.backend.release_lease(key)
+        for key in pending:
+            if key not in values:
+                values[key] = self._fetch_shared(key, lambda k: fetch_many([k])[k], ttl)
+        return values
+
+    def _fetch_shared(self, key, fetch, ttl):
+        leased = self.backend.acquire_lease(key, self.lease_timeout)
+        if not leased:
+            # Another worker is fetching this key; wait for its result.
+            deadline = time.time() + self.lease_timeout
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = self.backend.get(key)
+                if entry is not None and entry[1] > time.time():
+                    self._count('coalesced')
+                    return entry[0]
+            logger.info(f"Fetch lease for {key} expired; fetching directly")
+            # Takes over the lease only if it has expired; never drop a live one
+            leased = self.backend.acquire_lease(key, self.lease_timeout)
+        try:
+            self._count('fetches')
+            value = fetch(key)
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        finally:
+            if leased:
+                self.backend.release_lease(key)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, fetches, coalesced = self.hits, self.misses, self.fetches, self.coalesced
+        lookups = hits + misses
+        return {
+            'entries': len(self.backend),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'fetches': fetches,
+            'coalesced': coalesced,
+        }
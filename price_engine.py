@@ -0,0 +1,97 @@
+import logging
+import os
+
+import pandas as pd
+
+import metrics
+from price_cache import PriceCache, create_backend
+from upstream import gateway
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Shared live price cache (backend selectable via PRICE_CACHE_BACKEND=memory|sqlite)
+PRICE_TTL = int(os.environ.get('PRICE_CACHE_TTL', 300))  # seconds
+MISSING_PRICE_TTL = 30  # retry unavailable quotes sooner
+price_cache = PriceCache(
+    create_backend(
+        os.environ.get('PRICE_CACHE_BACKEND', 'memory'),
+        max_entries=int(os.environ.get('PRICE_CACHE_MAX_ENTRIES', 2048)),
+        path=os.environ.get('PRICE_CACHE_PATH'),
+    ),
+    ttl=PRICE_TTL,
+)
+
+# Daily bars requested per quote batch; covers weekends and holidays
+QUOTE_PERIOD = "5d"
+
+
+def _price_ttl(price):
+    return MISSING_PRICE_TTL if price == 'N/A' else PRICE_TTL
+
+
+def _fetch_prices(symbols):
+    """
+    Fetch live prices for symbols from Yahoo in one batched download through the
+    upstream gateway, so a page costs one rate-limit token however many symbols
+    it shows. The price is the close of each symbol's latest bar (today's bar
+    while the market is open). Returns symbol -> price ('N/A' when unavailable).
+    """
+    prices = dict.fromkeys(symbols, 'N/A')
+    try:
+        data = gateway.download(list(symbols), period=QUOTE_PERIOD, interval="1d", group_by='ticker',
+                                auto_adjust=False, threads=True, progress=False)
+    except Exception as e:
+        logger.error(f"Error fetching live prices for {len(symbols)} symbols: {e}")
+        return prices
+    for symbol in symbols:
+        try:
+            frame = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+            closes = frame["Close"].dropna()
+            if not closes.empty:
+                prices[symbol] = float(closes.iloc[-1])
+        except Exception as e:
+            logger.error(f"Error reading live price for {symbol}: {e}")
+    return prices
+
+
+def get_prices(symbols):
+    """
+    Retrieve live prices for a collection of symbols.
+    Serves fresh entries from the shared cache and fetches every miss in a single
+    batched upstream call. Concurrent misses on the same symbol share one fetch.
+    Returns a dict of symbol -> price ('N/A' when unavailable).
+    """
+    prices = {}
+    misses = []
+    for symbol in dict.fromkeys(symbols):
+        price = price_cache.get(symbol)
+        if price is not None:
+            prices[symbol] = price
+        else:
+            misses.append(symbol)
+    if not misses:
+        return prices
+    with metrics.phase('upstream'):
+        prices.update(price_cache.fetch_many(misses, _fetch_prices, ttl=_price_ttl))
+    return prices
+
+
+def get_price(symbol):
+    """
+    Retrieve the latest live price for a given symbol.
+    """
+    return get_prices([symbol])[symbol]
+
+
+def refresh_prices(symbols):
+    """
+    Fetch fresh prices for symbols regardless of cache age, in one batched call,
+    and store them in the cache, so page views reuse what a poller fetched.
+    Returns symbol -> price.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    prices = _fetch_prices(symbols)
+    for symbol, price in prices.items():
+        price_cache.set(symbol, price, ttl=_price_ttl(price))
+    return prices
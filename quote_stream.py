@@ -0,0 +1,155 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 64
+DEFAULT_MAX_SYMBOLS = 500  # distinct symbols polled per process
+DEFAULT_MAX_STREAMS_PER_OWNER = 5
+
+
+class SubscriptionLimitError(Exception):
+    """Raised when a subscription would exceed the hub's symbol or per-client stream limit."""
+
+
+class _Subscription:
+    def __init__(self, symbols, owner):
+        self.symbols = symbols
+        self.owner = owner
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.ready = False  # a snapshot has been sent
+
+
+class QuoteHub:
+    """
+    Polls upstream once per interval for the union of every subscriber's symbols,
+    in one batched fetch on a single background thread, and fans the results out.
+    Each symbol is reference-counted by the subscriptions watching it, so
+    overlapping symbol sets are fetched once. Subscribers first receive a snapshot of their own symbols,
+    then only those whose price changed since the previous poll. Symbols new to
+    the hub are fetched right away rather than at the next interval.
+    """
+
+    def __init__(self, fetch, interval=15, max_symbols=DEFAULT_MAX_SYMBOLS,
+                 max_streams_per_owner=DEFAULT_MAX_STREAMS_PER_OWNER):
+        self.fetch = fetch
+        self.interval = interval
+        self.max_symbols = max_symbols
+        self.max_streams_per_owner = max_streams_per_owner
+        self.latest = {}
+        self._refcounts = {}
+        self._subscriptions = {}  # queue -> _Subscription
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, symbols, owner=None):
+        """
+        Start watching symbols and return the queue messages are delivered on.
+        Raises SubscriptionLimitError if owner already has max_streams_per_owner
+        streams open or the hub would poll more than max_symbols symbols.
+        """
+        subscription = _Subscription(frozenset(symbols), owner)
+        with self._lock:
+            if owner is not None and sum(s.owner == owner for s in self._subscriptions.values()) \
+                    >= self.max_streams_per_owner:
+                raise SubscriptionLimitError(f"At most {self.max_streams_per_owner} quote streams per user")
+            added = subscription.symbols.difference(self._refcounts)
+            if len(self._refcounts) + len(added) > self.max_symbols:
+                raise SubscriptionLimitError("Too many symbols are being streamed; try again later")
+            for symbol in subscription.symbols:
+                self._refcounts[symbol] = self._refcounts.get(symbol, 0) + 1
+            self._subscriptions[subscription.queue] = subscription
+            self._deliver_snapshot(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="quote-poller", daemon=True)
+                self._thread.start()
+        if added:
+            self._wake.set()
+        return subscription.queue
+
+    def unsubscribe(self, q):
+        with self._lock:
+            subscription = self._subscriptions.pop(q, None)
+            if subscription is None:
+                return
+            for symbol in subscription.symbols:
+                self._refcounts[symbol] -= 1
+                if self._refcounts[symbol] == 0:
+                    del self._refcounts[symbol]
+                    self.latest.pop(symbol, None)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _message(self, quotes, snapshot=False):
+        return {'type': 'snapshot' if snapshot else 'delta', 'as_of': time.time(), 'quotes': quotes}
+
+    def _put(self, subscription, message):
+        try:
+            subscription.queue.put_nowait(message)
+        except queue.Full:
+            # Slow client: replace its backlog with one full snapshot.
+            try:
+                while True:
+                    subscription.queue.get_nowait()
+            except queue.Empty:
+                pass
+            subscription.queue.put_nowait(self._message(
+                {s: self.latest[s] for s in subscription.symbols if s in self.latest}, snapshot=True))
+
+    def _deliver_snapshot(self, subscription):
+        # Called with the lock held; waits until every symbol has been polled once.
+        if all(symbol in self.latest for symbol in subscription.symbols):
+            subscription.ready = True
+            self._put(subscription, self._message(
+                {s: self.latest[s] for s in subscription.symbols}, snapshot=True))
+
+    def _publish(self, changed):
+        with self._lock:
+            for subscription in self._subscriptions.values():
+                if not subscription.ready:
+                    self._deliver_snapshot(subscription)
+                    continue
+                delta = {s: p for s, p in changed.items() if s in subscription.symbols}
+                if delta:
+                    self._put(subscription, self._message(delta))
+
+    def _poll(self, symbols):
+        prices = self.fetch(symbols)
+        with self._lock:
+            # Drop symbols whose last subscriber left during the fetch
+            prices = {s: p for s, p in prices.items() if s in self._refcounts}
+            changed = {s: p for s, p in prices.items() if self.latest.get(s, object()) != p}
+            self.latest.update(prices)
+        self._publish(changed)
+
+    def _loop(self):
+        next_poll = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                with self._lock:
+                    if time.monotonic() >= next_poll:
+                        symbols = list(self._refcounts)
+                        next_poll = time.monotonic() + self.interval
+                    else:
+                        # Only symbols no poll has covered yet (new subscriptions)
+                        symbols = [s for s in self._refcounts if s not in self.latest]
+                if symbols:
+                    self._poll(symbols)
+            except Exception as e:
+                # One thread serves every stream; log and poll again next time.
+                logger.exception(f"Quote poll failed: {e}")
+            self._wake.wait(max(next_poll - time.monotonic(), 0))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'symbols': len(self._refcounts),
+                'subscribers': len(self._subscriptions),
+            }
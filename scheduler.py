@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process refreshes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataScheduler:
+    """
+    Runs a refresh job on a background thread every `interval` seconds.
+    An exclusive file lock ensures only one process on the host runs the job at a
+    time, and the job is skipped while `target_path` is younger than the interval,
+    so workers that wake up right after another one refreshed do nothing.
+    """
+
+    def __init__(self, job, interval, target_path, lock_path=None, retry_delay=60):
+        self.job = job
+        self.interval = interval
+        self.retry_delay = retry_delay
+        self.target_path = target_path
+        self.lock_path = lock_path or f"{target_path}.lock"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="market-data-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Market data scheduler started (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Market data refresh failed: {e}")
+            self._stop.wait(self._seconds_until_due())
+
+    def _age(self):
+        try:
+            return time.time() - os.path.getmtime(self.target_path)
+        except OSError:
+            return None
+
+    def _seconds_until_due(self):
+        age = self._age()
+        if age is None or age >= self.interval:
+            # Last refresh failed or was skipped; retry without hammering upstream.
+            return min(self.interval, self.retry_delay)
+        return self.interval - age
+
+    def is_stale(self):
+        age = self._age()
+        return age is None or age >= self.interval
+
+    def run_once(self):
+        """
+        Run the job if the target is stale and no other process holds the lock.
+        Returns True if the job ran.
+        """
+        if not self.is_stale():
+            return False
+        with open(self.lock_path, "w") as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    logger.info("Market data refresh already running in another process")
+                    return False
+            try:
+                # Re-check under the lock: another process may have just finished.
+                if not self.is_stale():
+                    return False
+                started = time.time()
+                self.job()
+                logger.info(f"Market data refresh took {time.time() - started:.1f}s")
+                return True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,135 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from models import db, SymbolMetadata, dialect_insert
+from upstream import gateway
+
+logger = logging.getLogger(__name__)
+
+METADATA_TTL = timedelta(days=30)
+FAILED_METADATA_TTL = timedelta(minutes=10)  # retry delay after a failed fetch
+FIELDS = ("long_name", "exchange", "currency", "sector")
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="metadata-fetch")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _fetch_metadata(symbol):
+    """
+    Fetch descriptive fields for one symbol from Yahoo's (slow) info endpoint.
+    Returns None on failure.
+    """
+    try:
+        info = gateway.info(symbol)
+    except Exception as e:
+        logger.error(f"Error fetching metadata for {symbol}: {e}")
+        return None
+    return {
+        "symbol": symbol,
+        "long_name": info.get("longName") or info.get("shortName"),
+        "exchange": info.get("exchange"),
+        "currency": info.get("currency"),
+        "sector": info.get("sector"),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def _store(rows):
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return
+    stmt = dialect_insert(SymbolMetadata.__table__, db.engine)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol"],
+        set_={field: getattr(stmt.excluded, field) for field in FIELDS + ("updated_at",)},
+    )
+    db.session.execute(stmt, rows)
+    db.session.commit()
+
+
+def _store_failures(symbols):
+    """
+    Record failed fetches so they are retried after FAILED_METADATA_TTL instead of
+    on every view: unknown symbols get an empty row, known ones keep their fields.
+    Either way updated_at is set so the row turns stale FAILED_METADATA_TTL from now.
+    """
+    if not symbols:
+        return
+    updated_at = datetime.utcnow() - METADATA_TTL + FAILED_METADATA_TTL
+    stmt = dialect_insert(SymbolMetadata.__table__, db.engine)
+    stmt = stmt.on_conflict_do_update(index_elements=["symbol"], set_={"updated_at": stmt.excluded.updated_at})
+    db.session.execute(stmt, [dict({field: None for field in FIELDS}, symbol=symbol, updated_at=updated_at)
+                              for symbol in symbols])
+    db.session.commit()
+
+
+def _store_results(symbols, rows):
+    _store(rows)
+    _store_failures([symbol for symbol, row in zip(symbols, rows) if row is None])
+
+
+def _as_dict(row, symbol):
+    if row is None:
+        return {"symbol": symbol, "long_name": symbol, "exchange": None, "currency": None, "sector": None}
+    data = {field: row.get(field) if isinstance(row, dict) else getattr(row, field) for field in FIELDS}
+    data["symbol"] = symbol
+    data["long_name"] = data["long_name"] or symbol
+    return data
+
+
+def _refresh_in_background(symbol):
+    with _refreshing_lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+    app = current_app._get_current_object()
+
+    def refresh():
+        try:
+            with app.app_context():
+                _store_results([symbol], [_fetch_metadata(symbol)])
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(symbol)
+
+    _executor.submit(refresh)
+
+
+def get_metadata(symbol):
+    """
+    Return long_name, exchange, currency and sector for symbol from the database.
+    Unknown symbols are fetched once inline (a failure is stored as an empty row,
+    retried after FAILED_METADATA_TTL); rows older than METADATA_TTL are served
+    as-is and refreshed in the background. long_name falls back to symbol.
+    """
+    row = db.session.get(SymbolMetadata, symbol)
+    if row is None:
+        fetched = _fetch_metadata(symbol)
+        _store_results([symbol], [fetched])
+        return _as_dict(fetched, symbol)
+    if datetime.utcnow() - row.updated_at > METADATA_TTL:
+        _refresh_in_background(symbol)
+    return _as_dict(row, symbol)
+
+
+def prefetch_metadata(symbols):
+    """
+    Fetch metadata concurrently for every symbol that is missing or stale and store
+    it in one transaction. Must be called inside an application context.
+    """
+    cutoff = datetime.utcnow() - METADATA_TTL
+    fresh = {symbol for (symbol,) in db.session.query(SymbolMetadata.symbol)
+             .filter(SymbolMetadata.symbol.in_(symbols), SymbolMetadata.updated_at >= cutoff)}
+    due = [symbol for symbol in symbols if symbol not in fresh]
+    if not due:
+        return 0
+    rows = list(_executor.map(_fetch_metadata, due))
+    _store_results(due, rows)
+    stored = sum(row is not None for row in rows)
+    logger.info(f"Prefetched metadata for {stored}/{len(due)} symbols")
+    return stored
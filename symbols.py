@@ -0,0 +1,242 @@
+import bisect
+import csv
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Optional full NSE equity list in NSE's EQUITY_L.csv format (SYMBOL, NAME OF COMPANY, ...)
+NSE_SYMBOLS_CSV = os.environ.get(
+    'NSE_SYMBOLS_CSV',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'nse_symbols.csv'),
+)
+NSE_SYMBOLS_URL = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+
+# -------------------------------
+# Configured universe: refreshed by the market data pipeline and shown on the list pages
+
+# Nifty 50 symbols
+nifty_50_names = {
+    "ADANIENT.NS": "Adani Enterprises", "ADANIPORTS.NS": "Adani Ports and SEZ",
+    "ASIANPAINT.NS": "Asian Paints", "AXISBANK.NS": "Axis Bank", "BAJAJ-AUTO.NS": "Bajaj Auto",
+    "BAJFINANCE.NS": "Bajaj Finance", "BAJAJFINSV.NS": "Bajaj Finserv",
+    "BPCL.NS": "Bharat Petroleum Corporation", "BHARTIARTL.NS": "Bharti Airtel",
+    "BRITANNIA.NS": "Britannia Industries", "CIPLA.NS": "Cipla", "COALINDIA.NS": "Coal India",
+    "DIVISLAB.NS": "Divi's Laboratories", "DRREDDY.NS": "Dr. Reddy's Laboratories",
+    "EICHERMOT.NS": "Eicher Motors", "GRASIM.NS": "Grasim Industries", "HCLTECH.NS": "HCL Technologies",
+    "HDFCBANK.NS": "HDFC Bank", "HDFCLIFE.NS": "HDFC Life Insurance", "HEROMOTOCO.NS": "Hero MotoCorp",
+    "HINDALCO.NS": "Hindalco Industries", "HINDUNILVR.NS": "Hindustan Unilever",
+    "ICICIBANK.NS": "ICICI Bank", "ITC.NS": "ITC", "INDUSINDBK.NS": "IndusInd Bank",
+    "INFY.NS": "Infosys", "JSWSTEEL.NS": "JSW Steel", "KOTAKBANK.NS": "Kotak Mahindra Bank",
+    "LTIM.NS": "LTIMindtree", "LT.NS": "Larsen & Toubro", "M&M.NS": "Mahindra & Mahindra",
+    "MARUTI.NS": "Maruti Suzuki India", "NTPC.NS": "NTPC", "NESTLEIND.NS": "Nestle India",
+    "ONGC.NS": "Oil and Natural Gas Corporation", "POWERGRID.NS": "Power Grid Corporation of India",
+    "RELIANCE.NS": "Reliance Industries", "SBILIFE.NS": "SBI Life Insurance",
+    "SBIN.NS": "State Bank of India", "SUNPHARMA.NS": "Sun Pharmaceutical Industries",
+    "TCS.NS": "Tata Consultancy Services", "TATACONSUM.NS": "Tata Consumer Products",
+    "TATAMOTORS.NS": "Tata Motors", "TATASTEEL.NS": "Tata Steel", "TECHM.NS": "Tech Mahindra",
+    "TITAN.NS": "Titan Company", "UPL.NS": "UPL", "ULTRACEMCO.NS": "UltraTech Cement",
+    "WIPRO.NS": "Wipro",
+}
+nifty_50_symbols = list(nifty_50_names)
+
+# Commodity ETFs
+commodity_names = {
+    "GOLDBEES.NS": "Nippon India ETF Gold BeES",
+    "SILVERBEE.NS": "Nippon India Silver ETF",
+}
+commodity_symbols = list(commodity_names)
+
+# Currency pairs (conversion rates to INR)
+currency_names = {
+    "USDINR=X": "US Dollar / Indian Rupee",
+    "EURINR=X": "Euro / Indian Rupee",
+    "GBPINR=X": "British Pound / Indian Rupee",
+    "JPYINR=X": "Japanese Yen / Indian Rupee",
+    "AUDINR=X": "Australian Dollar / Indian Rupee",
+}
+currency_symbols = list(currency_names)
+
+# Asset class of every symbol in the universe
+asset_classes = {
+    "share": nifty_50_symbols,
+    "commodity": commodity_symbols,
+    "currency": currency_symbols,
+}
+
+# Combine all tickers for a single data download
+all_tickers = nifty_50_symbols + commodity_symbols + currency_symbols
+
+
+# -------------------------------
+# Registry and search index
+class SymbolEntry:
+    __slots__ = ("symbol", "name", "asset_class")
+
+    def __init__(self, symbol, name, asset_class):
+        self.symbol = symbol
+        self.name = name
+        self.asset_class = asset_class
+
+    def to_dict(self):
+        return {"symbol": self.symbol, "name": self.name, "asset_class": self.asset_class}
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SymbolRegistry:
+    """
+    Immutable set of known symbols with two indexes built once at load time:
+    a sorted prefix index over symbols and name words, and a trigram index over
+    "symbol name" for substring matches. Lookups never scan the whole list.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.by_symbol = {e.symbol: e for e in self.entries}
+        self.names = {e.symbol: e.name for e in self.entries}
+
+        symbol_keys = []
+        word_keys = []
+        self._text = []
+        trigrams = {}
+        for i, entry in enumerate(self.entries):
+            symbol = entry.symbol.lower()
+            symbol_keys.extend((key, i) for key in {symbol, symbol.split(".")[0]})
+            word_keys.extend((word, i) for word in set(entry.name.lower().split()))
+            text = f"{symbol} {entry.name.lower()}"
+            self._text.append(text)
+            for gram in _trigrams(text):
+                trigrams.setdefault(gram, []).append(i)
+        self._symbol_index = self._sorted_index(symbol_keys)
+        self._word_index = self._sorted_index(word_keys)
+        self._trigrams = {gram: frozenset(ids) for gram, ids in trigrams.items()}
+
+    @staticmethod
+    def _sorted_index(pairs):
+        pairs.sort()
+        return [key for key, _ in pairs], [i for _, i in pairs]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, symbol):
+        return self.by_symbol.get(symbol)
+
+    @staticmethod
+    def _prefix_range(index, query):
+        keys, ids = index
+        lo = bisect.bisect_left(keys, query)
+        hi = bisect.bisect_left(keys, query + "\uffff")
+        return keys, ids, lo, hi
+
+    def _substring_matches(self, query):
+        grams = sorted(_trigrams(query), key=lambda g: len(self._trigrams.get(g, ())))
+        candidates = self._trigrams.get(grams[0], frozenset())
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates = candidates & self._trigrams.get(gram, frozenset())
+        return (i for i in sorted(candidates) if query in self._text[i])
+
+    def search(self, query, limit=10, asset_class=None):
+        """
+        Find symbols by symbol or company name. Ranks exact symbol matches first,
+        then symbol prefixes, name-word prefixes and finally substring matches
+        (queries of 3+ characters). Stops as soon as limit results are found;
+        limit=None returns every match.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        found = {}
+
+        def add(i, rank):
+            if i not in found and (asset_class is None or self.entries[i].asset_class == asset_class):
+                found[i] = rank
+            return limit is not None and len(found) >= limit
+
+        # Keys sort by length within a prefix range, so an exact match comes first.
+        keys, ids, lo, hi = self._prefix_range(self._symbol_index, query)
+        done = any(add(ids[n], 0 if keys[n] == query else 1) for n in range(lo, hi))
+        if not done:
+            keys, ids, lo, hi = self._prefix_range(self._word_index, query)
+            done = any(add(ids[n], 2) for n in range(lo, hi))
+        if not done and len(query) >= 3:
+            any(add(i, 3) for i in self._substring_matches(query))
+        return [self.entries[i] for i in sorted(found, key=found.get)]
+
+
+def _universe_entries():
+    for asset_class, names in (("share", nifty_50_names), ("commodity", commodity_names),
+                               ("currency", currency_names)):
+        for symbol, name in names.items():
+            yield SymbolEntry(symbol, name, asset_class)
+
+
+def _nse_entries(path):
+    """
+    Read NSE's EQUITY_L.csv (or a file in the same format) as .NS symbols.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            symbol = row.get("SYMBOL")
+            if symbol:
+                yield SymbolEntry(f"{symbol}.NS", row.get("NAME OF COMPANY") or symbol, "share")
+
+
+def load_registry(nse_path=NSE_SYMBOLS_CSV):
+    """
+    Build the registry from the configured universe plus the NSE list, if present.
+    """
+    entries = {e.symbol: e for e in _universe_entries()}
+    if os.path.exists(nse_path):
+        try:
+            for entry in _nse_entries(nse_path):
+                entries.setdefault(entry.symbol, entry)
+        except Exception as e:
+            logger.error(f"Error reading NSE symbol list {nse_path}: {e}")
+    registry = SymbolRegistry(entries.values())
+    logger.info(f"Symbol registry loaded with {len(registry)} symbols")
+    return registry
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Process-wide registry, loaded on first use.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_registry()
+    return _registry
+
+
+def download_nse_list(path=NSE_SYMBOLS_CSV, url=NSE_SYMBOLS_URL):
+    """
+    Download NSE's equity list to path (written atomically).
+    """
+    import requests
+
+    response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=30)
+    response.raise_for_status()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(response.content)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved NSE symbol list to {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    download_nse_list()
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from analytics import EMA_SPANS, compute_stats, ema_fold
+from history_store import BAR_DTYPE, DAY
+
+
+def make_bars(n, seed=3):
+    rng = np.random.default_rng(seed)
+    bars = np.zeros(n, dtype=BAR_DTYPE)
+    bars['ts'] = (np.arange(n) + 18000) * DAY
+    bars['close'] = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    bars['high'] = bars['close'] * 1.01
+    bars['low'] = bars['close'] * 0.99
+    return bars
+
+
+def naive_ema(values, span):
+    alpha = 2.0 / (span + 1)
+    state = values[0]
+    for value in values[1:]:
+        state = state + alpha * (value - state)
+    return state
+
+
+def test_ema_fold_matches_the_recurrence():
+    values = make_bars(300)['close']
+    alpha = 2.0 / 13
+    folded = ema_fold(values[0], values[1:], alpha)
+    assert folded[-1] == pytest.approx(naive_ema(values, 12), rel=1e-12)
+
+
+def test_incremental_emas_equal_a_full_recompute():
+    bars = make_bars(400)
+    previous = SimpleNamespace(**compute_stats('TCS.NS', bars[:390]))
+    incremental = compute_stats('TCS.NS', bars, previous)
+    full = compute_stats('TCS.NS', bars)
+    for span in EMA_SPANS:
+        assert incremental[f'ema_{span}'] == pytest.approx(full[f'ema_{span}'], rel=1e-12)
+        assert incremental[f'ema_{span}'] == pytest.approx(naive_ema(bars['close'], span), rel=1e-12)
+        assert incremental[f'ema_{span}_base'] == pytest.approx(full[f'ema_{span}_base'], rel=1e-12)
+
+
+def test_revised_last_bar_is_folded_again():
+    bars = make_bars(250)
+    previous = SimpleNamespace(**compute_stats('TCS.NS', bars))
+    assert compute_stats('TCS.NS', bars, previous) is None  # nothing new
+
+    bars['close'][-1] *= 1.05
+    revised = compute_stats('TCS.NS', bars, previous)
+    full = compute_stats('TCS.NS', bars)
+    for span in EMA_SPANS:
+        assert revised[f'ema_{span}'] == pytest.approx(full[f'ema_{span}'], rel=1e-12)
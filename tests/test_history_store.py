@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from history_store import BAR_DTYPE, DAY, HistoryStore
+
+
+def make_bars(days, close):
+    bars = np.zeros(len(days), dtype=BAR_DTYPE)
+    bars['ts'] = np.asarray(days) * DAY
+    bars['close'] = close
+    return bars
+
+
+def test_append_replaces_overlapping_and_revised_bars(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('TCS.NS', make_bars([1, 2, 3], [10.0, 11.0, 12.0]))
+    # A sync from the last stored date re-fetches day 3 with its final close
+    store.append('TCS.NS', make_bars([3, 4], [12.5, 13.0]))
+
+    bars = store.bars('TCS.NS')
+    assert list(bars['ts'] // DAY) == [1, 2, 3, 4]
+    assert list(bars['close']) == [10.0, 11.0, 12.5, 13.0]
+
+
+def test_append_of_older_bars_drops_everything_after_them(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('TCS.NS', make_bars([1, 2, 3], [10.0, 11.0, 12.0]))
+    store.append('TCS.NS', make_bars([2], [11.5]))
+    assert list(store.bars('TCS.NS')['close']) == [10.0, 11.5]
+
+
+def test_empty_append_leaves_symbol_due(tmp_path):
+    store = HistoryStore(str(tmp_path), sync_ttl=3600)
+    store.append('TCS.NS', make_bars([1], [10.0]))
+    path = store._path('TCS.NS')
+    os.utime(path, (0, 0))
+    store.append('TCS.NS', make_bars([], []))
+    assert os.path.getmtime(path) == 0
+    assert store.is_due('TCS.NS')
+
+
+def test_open_maps_are_bounded(tmp_path):
+    store = HistoryStore(str(tmp_path), max_open_maps=2)
+    for symbol in ('A', 'B', 'C'):
+        store.append(symbol, make_bars([1], [1.0]))
+        store.bars(symbol)
+    assert list(store._maps) == ['B', 'C']
+    assert store.last_close('A') == 1.0
+    assert list(store._maps) == ['C', 'A']
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from holdings_io import import_holdings, validate_lot
+from models import db
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (id, username, password) VALUES (1, 'a', 'x')"))
+    return engine
+
+
+def test_validate_lot_cleans_values():
+    lot = validate_lot({'asset_type': ' Share ', 'asset_symbol': ' infy.ns ',
+                        'quantity': '1,000', 'purchase_price': 12.5})
+    assert lot == {'asset_type': 'share', 'asset_symbol': 'INFY.NS',
+                   'quantity': 1000.0, 'purchase_price': 12.5}
+    assert validate_lot({'asset_symbol': 'TCS.NS', 'quantity': 1, 'purchase_price': 0})['asset_type'] == 'share'
+
+
+@pytest.mark.parametrize('row, message', [
+    ({'asset_type': 'bond', 'asset_symbol': 'X', 'quantity': 1, 'purchase_price': 1}, 'asset_type'),
+    ({'asset_symbol': ' ', 'quantity': 1, 'purchase_price': 1}, 'asset_symbol is required'),
+    ({'asset_symbol': 'X' * 33, 'quantity': 1, 'purchase_price': 1}, 'too long'),
+    ({'asset_symbol': 'X', 'quantity': 'ten', 'purchase_price': 1}, 'quantity must be a number'),
+    ({'asset_symbol': 'X', 'quantity': 0, 'purchase_price': 1}, 'quantity must be positive'),
+    ({'asset_symbol': 'X', 'quantity': 'nan', 'purchase_price': 1}, 'finite'),
+    ({'asset_symbol': 'X', 'quantity': 1, 'purchase_price': ''}, 'purchase_price is required'),
+    ({'asset_symbol': 'X', 'quantity': 1, 'purchase_price': -1}, 'cannot be negative'),
+])
+def test_validate_lot_rejects_bad_rows(row, message):
+    with pytest.raises(ValueError, match=message):
+        validate_lot(row)
+
+
+def positions(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT asset_symbol, quantity, cost FROM position ORDER BY asset_symbol")).fetchall()
+
+
+def test_csv_import_reports_bad_lines_and_keeps_good_ones(engine):
+    data = ("Type,Symbol,Qty,Price\n"
+            "share,infy.ns,2,100\n"
+            "share,TCS.NS,-1,100\n"
+            "\n"
+            "share,INFY.NS,1,130\n"
+            "bond,X,1,1\n").encode()
+    result = import_holdings(1, io.BytesIO(data), 'lots.csv', engine=engine, chunk_size=2)
+    assert result.imported == 2
+    assert result.failed == 2
+    assert [line for line, _ in result.errors] == [3, 6]
+    assert positions(engine) == [('INFY.NS', 3.0, 330.0)]
+
+
+def test_xlsx_import_reports_bad_lines(engine):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['asset_type', 'asset_symbol', 'quantity', 'purchase_price'])
+    sheet.append(['share', 'TCS.NS', 3, 50])
+    sheet.append(['share', None, 1, 10])
+    sheet.append(['currency', 'USDINR=X', 'x', 80])
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+
+    result = import_holdings(1, stream, 'lots.xlsx', engine=engine)
+    assert result.imported == 1
+    assert [line for line, _ in result.errors] == [3, 4]
+    assert positions(engine) == [('TCS.NS', 3.0, 150.0)]
@@ -0,0 +1,82 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from migrations import migrate
+from models import db, dialect_insert, Favorite
+
+# Schema as created by db.create_all() before positions and the symbol indexes
+BASELINE_SCHEMA = [
+    "CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(150) NOT NULL UNIQUE, "
+    "password VARCHAR(150) NOT NULL)",
+    "CREATE TABLE favorite (id INTEGER PRIMARY KEY, stock_symbol VARCHAR(10) NOT NULL, "
+    "user_id INTEGER NOT NULL REFERENCES user (id))",
+    "CREATE TABLE holding (id INTEGER PRIMARY KEY, asset_type VARCHAR(50) NOT NULL, "
+    "asset_symbol VARCHAR(10) NOT NULL, quantity FLOAT NOT NULL, purchase_price FLOAT NOT NULL, "
+    "user_id INTEGER NOT NULL REFERENCES user (id))",
+]
+
+
+@pytest.fixture
+def baseline_app(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'app.db'}"
+    with create_engine(uri).begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO user (id, username, password) VALUES (1, 'a', 'x'), (2, 'b', 'x')"))
+        conn.execute(text(
+            "INSERT INTO holding (asset_type, asset_symbol, quantity, purchase_price, user_id) VALUES "
+            "('share', 'infy.ns', 2, 100, 1), ('share', 'INFY.NS', 1, 130, 1), "
+            "('share', 'TCS.NS', 3, 50, 2)"))
+        conn.execute(text("INSERT INTO favorite (stock_symbol, user_id) VALUES "
+                          "('TCS.NS', 1), ('TCS.NS', 1), ('INFY.NS', 1)"))
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=uri, SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    with app.app_context():
+        yield app
+
+
+def positions():
+    return db.session.execute(text(
+        "SELECT user_id, asset_symbol, quantity, cost FROM position ORDER BY user_id")).fetchall()
+
+
+def test_migrate_upgrades_baseline_database(baseline_app):
+    migrate()
+
+    assert positions() == [(1, 'INFY.NS', 3.0, 330.0), (2, 'TCS.NS', 3.0, 150.0)]
+    symbols = db.session.execute(text("SELECT DISTINCT asset_symbol FROM holding")).scalars().all()
+    assert sorted(symbols) == ['INFY.NS', 'TCS.NS']
+    favorites = db.session.execute(text("SELECT stock_symbol FROM favorite ORDER BY id")).scalars().all()
+    assert favorites == ['TCS.NS', 'INFY.NS']
+
+    # The unique index now backs insert-or-ignore
+    stmt = dialect_insert(Favorite.__table__, db.engine).values(stock_symbol='TCS.NS', user_id=1)
+    assert db.session.execute(stmt.on_conflict_do_nothing()).rowcount == 0
+
+
+def test_migrate_is_idempotent(baseline_app):
+    migrate()
+    migrate()
+    assert positions() == [(1, 'INFY.NS', 3.0, 330.0), (2, 'TCS.NS', 3.0, 150.0)]
+
+
+def test_migrate_rebuilds_positions_from_lower_case_lots(baseline_app):
+    migrate()
+    db.session.execute(text("UPDATE holding SET asset_symbol = 'tcs.ns' WHERE user_id = 2"))
+    db.session.execute(text("INSERT INTO position (user_id, asset_type, asset_symbol, quantity, cost) "
+                            "VALUES (2, 'share', 'tcs.ns', 1, 10)"))
+    db.session.commit()
+    migrate()
+    assert positions() == [(1, 'INFY.NS', 3.0, 330.0), (2, 'TCS.NS', 3.0, 150.0)]
+
+
+def test_dialect_insert_rejects_unsupported_databases():
+    class Bind:
+        class dialect:
+            name = 'mysql'
+
+    with pytest.raises(NotImplementedError):
+        dialect_insert(Favorite.__table__, Bind)
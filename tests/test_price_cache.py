@@ -0,0 +1,102 @@
+import threading
+import time
+
+from price_cache import PriceCache, SQLiteBackend
+
+
+class SlowFetch:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def one(self, key):
+        return self.many([key])[key]
+
+    def many(self, keys):
+        with self._lock:
+            self.calls.append(sorted(keys))
+        time.sleep(self.delay)
+        return {key: f"price-{key}" for key in keys}
+
+
+def run_concurrently(fn, n):
+    results = [None] * n
+
+    def worker(i):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = PriceCache()
+    fetch = SlowFetch()
+    results = run_concurrently(lambda: cache.get_or_fetch('TCS.NS', fetch.one), 8)
+    assert results == ['price-TCS.NS'] * 8
+    assert fetch.calls == [['TCS.NS']]
+    assert cache.stats()['fetches'] == 1
+    assert cache.stats()['coalesced'] == 7
+
+
+def test_fetch_many_batches_misses_and_joins_inflight_keys():
+    cache = PriceCache()
+    fetch = SlowFetch()
+    leader = threading.Thread(target=cache.fetch, args=('TCS.NS', fetch.one))
+    leader.start()
+    time.sleep(0.05)
+    values = cache.fetch_many(['TCS.NS', 'INFY.NS', 'WIPRO.NS'], fetch.many)
+    leader.join()
+    assert values == {s: f"price-{s}" for s in ('TCS.NS', 'INFY.NS', 'WIPRO.NS')}
+    assert fetch.calls == [['TCS.NS'], ['INFY.NS', 'WIPRO.NS']]
+    assert cache.get('INFY.NS') == 'price-INFY.NS'
+
+
+def test_sqlite_lease_waits_for_other_worker_then_takes_over_when_expired(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    other = SQLiteBackend(path=path)
+    assert other.acquire_lease('TCS.NS', 0.3)
+    cache = PriceCache(backend=SQLiteBackend(path=path), lease_timeout=0.3)
+    # A live lease is never taken over
+    assert not cache.backend.acquire_lease('TCS.NS', 0.3)
+
+    fetch = SlowFetch(delay=0)
+    started = time.monotonic()
+    assert cache.get_or_fetch('TCS.NS', fetch.one) == 'price-TCS.NS'
+    assert time.monotonic() - started >= 0.3
+    assert fetch.calls == [['TCS.NS']]
+    assert other.acquire_lease('TCS.NS', 0.3)  # released after the takeover
+
+
+def test_sqlite_lease_holder_result_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    other = SQLiteBackend(path=path)
+    assert other.acquire_lease('TCS.NS', 5)
+    cache = PriceCache(backend=SQLiteBackend(path=path))
+    threading.Timer(0.1, lambda: other.set('TCS.NS', 'from-other', time.time() + 60)).start()
+    fetch = SlowFetch(delay=0)
+    assert cache.get_or_fetch('TCS.NS', fetch.one) == 'from-other'
+    assert fetch.calls == []
+
+
+def test_sqlite_evicts_expired_then_least_recently_accessed(tmp_path):
+    backend = SQLiteBackend(path=str(tmp_path / 'cache.db'), max_entries=3)
+    now = time.time()
+    backend.set('stale', 'N/A', now - 1)
+    backend.set('old', 1.0, now + 300)
+    backend.set('hot', 2.0, now + 300)
+    backend.set('fresh-na', 'N/A', now + 30)
+    assert backend.get('stale') is None
+
+    time.sleep(0.01)
+    backend.get('old')  # a hit keeps it over the untouched 'hot'
+    backend.set('new', 3.0, now + 300)
+    assert backend.get('hot') is None
+    assert backend.get('old') is not None
+    assert backend.get('fresh-na') is not None
+    assert backend.evictions == 2
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from quote_stream import QuoteHub, SubscriptionLimitError
+
+
+class CountingFetch:
+    def __init__(self):
+        self.calls = []
+        self.price = 100.0
+        self._lock = threading.Lock()
+
+    def __call__(self, symbols):
+        with self._lock:
+            self.calls.append(sorted(symbols))
+        return {symbol: self.price for symbol in symbols}
+
+
+def test_overlapping_subscriptions_share_one_poll_per_interval():
+    fetch = CountingFetch()
+    hub = QuoteHub(fetch, interval=0.2)
+    try:
+        a = hub.subscribe(['RELIANCE.NS'])
+        b = hub.subscribe(['RELIANCE.NS', 'TCS.NS'])
+        assert a.get(timeout=2)['quotes'] == {'RELIANCE.NS': 100.0}
+        assert b.get(timeout=2)['quotes'] == {'RELIANCE.NS': 100.0, 'TCS.NS': 100.0}
+
+        fetch.calls.clear()
+        fetch.price = 101.0
+        message = b.get(timeout=2)
+        assert message['type'] == 'delta'
+        assert message['quotes'] == {'RELIANCE.NS': 101.0, 'TCS.NS': 101.0}
+        assert a.get(timeout=2)['quotes'] == {'RELIANCE.NS': 101.0}
+        assert fetch.calls == [['RELIANCE.NS', 'TCS.NS']]  # union, fetched once
+    finally:
+        hub.stop()
+
+
+def test_unsubscribe_drops_symbols_from_the_poll():
+    fetch = CountingFetch()
+    hub = QuoteHub(fetch, interval=0.1)
+    try:
+        a = hub.subscribe(['RELIANCE.NS'])
+        b = hub.subscribe(['TCS.NS'])
+        a.get(timeout=2), b.get(timeout=2)
+        hub.unsubscribe(b)
+        assert hub.stats() == {'symbols': 1, 'subscribers': 1}
+    finally:
+        hub.stop()
+
+
+def test_limits():
+    hub = QuoteHub(CountingFetch(), interval=10, max_symbols=3, max_streams_per_owner=2)
+    try:
+        hub.subscribe(['A', 'B'], owner=1)
+        hub.subscribe(['A'], owner=1)
+        with pytest.raises(SubscriptionLimitError):
+            hub.subscribe(['A'], owner=1)
+        with pytest.raises(SubscriptionLimitError):
+            hub.subscribe(['C', 'D'], owner=2)
+        hub.subscribe(['C'], owner=2)
+    finally:
+        hub.stop()
+
+
+def test_poller_survives_fetch_errors():
+    fetch = CountingFetch()
+    failing = [True]
+
+    def flaky(symbols):
+        if failing[0]:
+            failing[0] = False
+            raise RuntimeError("upstream down")
+        return fetch(symbols)
+
+    hub = QuoteHub(flaky, interval=0.1)
+    try:
+        q = hub.subscribe(['RELIANCE.NS'])
+        assert q.get(timeout=2)['quotes'] == {'RELIANCE.NS': 100.0}
+    finally:
+        hub.stop()
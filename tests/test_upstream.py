@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from fake_yfinance import FakeYFinance
+from upstream import CircuitBreaker, CircuitOpenError, Gateway, UpstreamError, UpstreamRejected
+
+
+def make_gateway(fake, **kwargs):
+    options = dict(rate=1000, burst=1000, retries=2, backoff=0.001,
+                   breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+    options.update(kwargs)
+    return Gateway(provider=fake, **options)
+
+
+def test_transient_failures_are_retried_then_raised():
+    fake = FakeYFinance(latency=0, failure_rate=1.0)
+    gateway = make_gateway(fake)
+    with pytest.raises(UpstreamError):
+        gateway.fast_info('TCS.NS')
+    assert fake.calls['fast_info'] == 3
+
+
+def test_unknown_symbol_is_not_retried_and_does_not_open_breaker():
+    fake = FakeYFinance(latency=0, unknown_symbols={f'BOGUS{n}' for n in range(20)})
+    gateway = make_gateway(fake)
+    for n in range(20):
+        with pytest.raises(UpstreamRejected):
+            gateway.fast_info(f'BOGUS{n}')
+    assert fake.calls['fast_info'] == 20
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+    assert gateway.fast_info('TCS.NS') > 0
+
+
+def test_breaker_opens_then_recovers_after_reset_timeout():
+    fake = FakeYFinance(latency=0, failure_rate=1.0)
+    gateway = make_gateway(fake, retries=0)
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            gateway.fast_info('TCS.NS')
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        gateway.fast_info('TCS.NS')
+    assert fake.calls['fast_info'] == 3  # rejected without calling upstream
+
+    fake.failure_rate = 0.0
+    time.sleep(0.25)
+    assert gateway.fast_info('TCS.NS') > 0  # half-open trial call
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_call_fails_at_deadline():
+    fake = FakeYFinance(latency=1.0)
+    gateway = make_gateway(fake, timeouts={'fast_info': 0.1})
+    started = time.monotonic()
+    with pytest.raises(UpstreamError, match="timed out"):
+        gateway.fast_info('TCS.NS')
+    assert time.monotonic() - started < 0.5
+
+
+def test_rate_limit_wait_is_bounded_by_deadline():
+    fake = FakeYFinance(latency=0)
+    gateway = make_gateway(fake, rate=1, burst=1, timeouts={'fast_info': 0.1})
+    gateway.fast_info('TCS.NS')
+    with pytest.raises(UpstreamError, match="rate limit"):
+        gateway.fast_info('INFY.NS')
+
+
+def test_last_known_quote_served_but_not_batch_download():
+    fake = FakeYFinance(latency=0)
+    gateway = make_gateway(fake, retries=0, breaker=CircuitBreaker(failure_threshold=100))
+    price = gateway.fast_info('TCS.NS')
+    gateway.download(['TCS.NS', 'INFY.NS'], period='5d')
+
+    fake.failure_rate = 1.0
+    assert gateway.fast_info('TCS.NS') == price
+    with pytest.raises(UpstreamError):
+        gateway.download(['TCS.NS', 'INFY.NS'], period='5d')
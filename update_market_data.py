@@ -1,99 +1,132 @@
+import csv
+import logging
 import os
+import tempfile
 from datetime import datetime, date
 import pandas as pd
-import yfinance as yf
-
-# Existing list: Nifty 50 symbols
-nifty_50_symbols = [
-    "ADANIENT.NS", "ADANIPORTS.NS", "ASIANPAINT.NS", "AXISBANK.NS", "BAJAJ-AUTO.NS",
-    "BAJFINANCE.NS", "BAJAJFINSV.NS", "BPCL.NS", "BHARTIARTL.NS", "BRITANNIA.NS",
-    "CIPLA.NS", "COALINDIA.NS", "DIVISLAB.NS", "DRREDDY.NS", "EICHERMOT.NS",
-    "GRASIM.NS", "HCLTECH.NS", "HDFCBANK.NS", "HDFCLIFE.NS", "HEROMOTOCO.NS",
-    "HINDALCO.NS", "HINDUNILVR.NS", "ICICIBANK.NS", "ITC.NS", "INDUSINDBK.NS",
-    "INFY.NS", "JSWSTEEL.NS", "KOTAKBANK.NS", "LTIM.NS", "LT.NS",
-    "M&M.NS", "MARUTI.NS", "NTPC.NS", "NESTLEIND.NS", "ONGC.NS",
-    "POWERGRID.NS", "RELIANCE.NS", "SBILIFE.NS", "SBIN.NS", "SUNPHARMA.NS",
-    "TCS.NS", "TATACONSUM.NS", "TATAMOTORS.NS", "TATASTEEL.NS", "TECHM.NS",
-    "TITAN.NS", "UPL.NS", "ULTRACEMCO.NS", "WIPRO.NS"
-]
-
-# New list: Two commodity tickers.
-commodity_symbols = [
-    "GOLDBEES.NS",  # Gold ETF
-    "SILVERBEE.NS"   # Silver ETF
-]
-
-# New list: Five top currency tickers (for conversion rates to INR).
-currency_symbols = [
-    "USDINR=X",     # US Dollar to INR
-    "EURINR=X",     # Euro to INR
-    "GBPINR=X",     # British Pound to INR
-    "JPYINR=X",     # Japanese Yen to INR
-    "AUDINR=X"      # Australian Dollar to INR
-]
-
-# Combine all tickers for a single data download
-all_tickers = nifty_50_symbols + commodity_symbols + currency_symbols
-
-def update_market_data():
-    csv_file = "market_data.csv"
-    # Check if file was already updated today and has valid data
-    if os.path.exists(csv_file):
-        mod_time = datetime.fromtimestamp(os.path.getmtime(csv_file)).date()
-        if mod_time == date.today():
-            try:
-                df_check = pd.read_csv(csv_file)
-                if not df_check.empty:
-                    print(":white_check_mark: Market data CSV is already up to date.")
-                    return
-                else:
-                    print(":warning: File is empty. Will re-fetch data.")
-            except Exception as e:
-                print(f":warning: Error reading CSV. Will re-fetch data: {e}")
-        else:
-            print(":arrows_counterclockwise: File is outdated. Will fetch new data.")
-    else:
-        print(":open_file_folder: No file found. Will fetch fresh data.")
 
-    # Proceed to fetch and save fresh data
-    print(":inbox_tray: Downloading fresh market data for Nifty 50, commodities, and currencies...")
-    try:
-        data = yf.download(
-            tickers=all_tickers,
-            period="1d",
-            interval="1d",
-            group_by='ticker',
-            auto_adjust=True,
-            threads=True
-        )
-    except Exception as e:
-        print(":x: Failed to download market data:", e)
-        return
+from symbols import asset_classes, all_tickers
+from upstream import gateway
+
+logger = logging.getLogger(__name__)
+
+MARKET_DATA_CSV = "market_data.csv"
+
+# Normalized schema shared by every writer and reader of market_data.csv
+COLUMNS = ["symbol", "asset_class", "open", "high", "low", "close", "volume", "last_updated"]
 
-    # Flatten the data for each symbol
-    data_rows = []
-    for symbol in all_tickers:
+def fetch_market_data(symbols=all_tickers):
+    """
+    Download the latest daily bar for every symbol in one batched request.
+    Returns a dict of symbol -> normalized row; symbols that failed are omitted.
+    """
+    data = gateway.download(
+        symbols,
+        period="5d",  # covers weekends/holidays; the last valid bar is used
+        interval="1d",
+        group_by='ticker',
+        auto_adjust=True,
+        threads=True,
+        progress=False
+    )
+    class_of = {symbol: asset_class for asset_class, members in asset_classes.items() for symbol in members}
+    last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = {}
+    for symbol in symbols:
         try:
-            # If the data was downloaded for a symbol, extract first (and only) row.
-            row = data[symbol].iloc[0]
-            data_rows.append({
-                "Symbol": symbol,
-                "Open": row["Open"],
-                "High": row["High"],
-                "Low": row["Low"],
-                "Close": row["Close"],
-                "Volume": row["Volume"],
-                "Last Updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
+            frame = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+            frame = frame.dropna(subset=["Close"])
+            if frame.empty:
+                logger.error(f"No market data for {symbol}")
+                continue
+            bar = frame.iloc[-1]
+            rows[symbol] = {
+                "symbol": symbol,
+                "asset_class": class_of.get(symbol, ""),
+                "open": bar["Open"],
+                "high": bar["High"],
+                "low": bar["Low"],
+                "close": bar["Close"],
+                "volume": bar["Volume"],
+                "last_updated": last_updated
+            }
         except Exception as e:
-            print(f":x: {symbol} failed: {e}")
-    
-    df = pd.DataFrame(data_rows)
-    if df.empty:
-        print(":warning: No data fetched. File will not be overwritten.")
-    else:
-        df.to_csv(csv_file, index=False)
-        print(f":white_check_mark: Market data saved to {csv_file}")
+            logger.error(f"Market data for {symbol} failed: {e}")
+    return rows
+
+
+def read_market_data(csv_file=MARKET_DATA_CSV):
+    """
+    Read the current file as a dict of symbol -> row (empty if missing or unreadable).
+    """
+    try:
+        with open(csv_file, newline="") as f:
+            return {row["symbol"]: row for row in csv.DictReader(f) if row.get("symbol")}
+    except (OSError, KeyError) as e:
+        logger.info(f"No previous market data in {csv_file}: {e}")
+        return {}
+
+
+def write_market_data(rows, csv_file=MARKET_DATA_CSV):
+    """
+    Write rows to a temp file in the same directory and atomically rename it over
+    csv_file, so readers see either the old or the new file, never a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(csv_file))
+    fd, tmp_path = tempfile.mkstemp(prefix=".market_data.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, csv_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def update_market_data(csv_file=MARKET_DATA_CSV, symbols=all_tickers):
+    """
+    Refresh csv_file for the whole universe with a single bulk download.
+    Symbols that fail keep their previous row; nothing is written if every symbol fails.
+    Returns the number of symbols refreshed.
+    """
+    logger.info(f"Downloading market data for {len(symbols)} symbols...")
+    try:
+        fresh = fetch_market_data(symbols)
+    except Exception as e:
+        logger.error(f"Failed to download market data: {e}")
+        return 0
+    if not fresh:
+        logger.warning("No market data fetched. File will not be overwritten.")
+        return 0
+
+    previous = read_market_data(csv_file)
+    rows = []
+    for symbol in symbols:
+        row = fresh.get(symbol) or previous.get(symbol)
+        if row is not None:
+            rows.append(row)
+    write_market_data(rows, csv_file)
+    logger.info(f"Market data for {len(fresh)}/{len(symbols)} symbols saved to {csv_file}")
+    return len(fresh)
+
+
+def is_up_to_date(csv_file=MARKET_DATA_CSV):
+    """
+    True if csv_file was written today and has at least one row.
+    """
+    if not os.path.exists(csv_file):
+        return False
+    mod_time = datetime.fromtimestamp(os.path.getmtime(csv_file)).date()
+    return mod_time == date.today() and bool(read_market_data(csv_file))
+
 
 if __name__ == "__main__":
-    update_market_data()
+    logging.basicConfig(level=logging.INFO)
+    if is_up_to_date():
+        logger.info("Market data CSV is already up to date.")
+    else:
+        update_market_data()
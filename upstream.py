@@ -0,0 +1,282 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint deadlines in seconds (including retries and rate-limit waits)
+DEFAULT_TIMEOUTS = {
+    'fast_info': 5,
+    'info': 10,
+    'history': 15,
+    'download': 60,
+}
+
+# Endpoints whose last successful result is served while upstream is failing.
+# The batch endpoints (download, history) are excluded: their callers store the
+# result, and must see the failure rather than re-store old bars as a fresh refresh.
+LAST_KNOWN_ENDPOINTS = frozenset({'fast_info', 'info'})
+
+# Exceptions that signal Yahoo throttling us rather than a connection problem
+RATE_LIMIT_ERRORS = {'YFRateLimitError'}
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call fails and no last-known result is available."""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised when the circuit breaker is open and no last-known result is available."""
+
+
+class UpstreamRejected(UpstreamError):
+    """Raised when upstream answered but the request itself failed (e.g. an unknown symbol)."""
+
+
+def is_transient(error):
+    """
+    True if error is a failure of the transport rather than of the request:
+    connection and HTTP errors (requests' and curl_cffi's exceptions are OSErrors),
+    timeouts and rate limiting. Only these are retried and count towards the
+    circuit breaker. A 4xx response other than 429 is the request's own fault.
+    """
+    if type(error).__name__ in RATE_LIMIT_ERRORS:
+        return True
+    if not isinstance(error, OSError):
+        return False
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is None or status == 429 or not 400 <= status < 500
+
+
+def _describe(key):
+    """
+    Short form of a call key for messages: the symbol, or the size of a batch.
+    """
+    head = key[0] if isinstance(key, tuple) else key
+    return f"{len(head)} symbols" if isinstance(head, tuple) else str(head)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Take one token, waiting up to timeout seconds. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets a single trial call through (half-open).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=10, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Upstream circuit opened after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class Gateway:
+    """
+    Single choke point for all market-data upstream calls (yfinance by default).
+    Every call is rate limited, bounded by a deadline and guarded by a circuit
+    breaker; transient failures are retried with jittered exponential backoff.
+    Successful results of LAST_KNOWN_ENDPOINTS are remembered per (endpoint, key)
+    and served when upstream is failing.
+    """
+
+    def __init__(self, provider=None, rate=5.0, burst=10, max_workers=16, retries=2,
+                 backoff=0.25, timeouts=None, breaker=None, last_known_size=512,
+                 transient=is_transient):
+        self._provider = provider
+        self.transient = transient
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.retries = retries
+        self.backoff = backoff
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.last_known_size = last_known_size
+        self._last_known = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            import yfinance
+            self._provider = yfinance
+        return self._provider
+
+    def set_provider(self, provider):
+        """
+        Swap the upstream implementation (e.g. a local fake for tests and benchmarks).
+        """
+        self._provider = provider
+        with self._lock:
+            self._last_known.clear()
+        self.breaker.record_success()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._last_known[key] = value
+            self._last_known.move_to_end(key)
+            while len(self._last_known) > self.last_known_size:
+                self._last_known.popitem(last=False)
+
+    def _fallback(self, key, error):
+        if key[0] in LAST_KNOWN_ENDPOINTS:
+            with self._lock:
+                if key in self._last_known:
+                    logger.warning(f"Serving last-known result: {error}")
+                    return self._last_known[key]
+        raise error
+
+    def call(self, endpoint, key, fn, timeout=None):
+        """
+        Run fn() against upstream under the gateway's policies and return its result.
+        Raises UpstreamError (or CircuitOpenError) if it fails and nothing is cached,
+        and UpstreamRejected, without retrying, if fn fails for a non-transient reason.
+        Each call's latency is recorded per endpoint and outcome
+        (ok, fallback, rejected, error or circuit_open).
+        """
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with metrics.phase('upstream'):
+                result, outcome = self._call(endpoint, key, fn, timeout)
+            return result
+        except CircuitOpenError:
+            outcome = 'circuit_open'
+            raise
+        except UpstreamRejected:
+            outcome = 'rejected'
+            raise
+        finally:
+            metrics.UPSTREAM_DURATION.observe(time.perf_counter() - started, endpoint=endpoint, outcome=outcome)
+
+    def _call(self, endpoint, key, fn, timeout):
+        cache_key = (endpoint, key)
+        label = f"{endpoint} {_describe(key)}"
+        if not self.breaker.allow():
+            error = CircuitOpenError(f"{label}: upstream circuit open")
+            return self._fallback(cache_key, error), 'fallback'
+
+        deadline = time.monotonic() + (timeout or self.timeouts.get(endpoint, 10))
+        error = None
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.bucket.acquire(timeout=remaining):
+                error = UpstreamError(f"{label}: deadline exceeded waiting for rate limit")
+                break
+            future = self._executor.submit(fn)
+            try:
+                result = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FuturesTimeout:
+                error = UpstreamError(f"{label}: timed out")
+                break
+            except Exception as e:
+                if not self.transient(e):
+                    # Upstream answered; the request itself is bad and would fail again
+                    self.breaker.record_success()
+                    raise UpstreamRejected(f"{label}: {e}") from e
+                error = UpstreamError(f"{label}: {e}")
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                if attempt == self.retries or time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            if endpoint in LAST_KNOWN_ENDPOINTS:
+                self._remember(cache_key, result)
+            return result, 'ok'
+
+        self.breaker.record_failure()
+        return self._fallback(cache_key, error), 'fallback'
+
+    # -------------------------------
+    # yfinance endpoints
+    def fast_info(self, symbol):
+        """
+        Last traded price from fast_info (None if Yahoo does not report one).
+        """
+        return self.call('fast_info', symbol,
+                         lambda: self.provider.Ticker(symbol).fast_info.get('last_price'))
+
+    def info(self, symbol):
+        return self.call('info', symbol, lambda: dict(self.provider.Ticker(symbol).info))
+
+    def history(self, symbol, **kwargs):
+        key = (symbol,) + tuple(sorted(kwargs.items()))
+        return self.call('history', key, lambda: self.provider.Ticker(symbol).history(**kwargs))
+
+    def download(self, tickers, **kwargs):
+        key = (tuple(tickers),) + tuple(sorted(kwargs.items()))
+        return self.call('download', key, lambda: self.provider.download(tickers=tickers, **kwargs))
+
+
+# Process-wide gateway used by every module that talks to Yahoo
+gateway = Gateway(
+    rate=float(os.environ.get('UPSTREAM_RATE', 5)),
+    burst=int(os.environ.get('UPSTREAM_BURST', 10)),
+    max_workers=int(os.environ.get('UPSTREAM_MAX_WORKERS', 16)),  # concurrent in-flight calls
+)
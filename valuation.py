@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import case
+
+from models import db, Holding, Position
+
+HOLDING_COLUMNS = ["user_id", "asset_type", "asset_symbol", "quantity", "purchase_price"]
+
+
+def holdings_query(user_id=None, aggregated=True):
+    """
+    Query yielding HOLDING_COLUMNS tuples, optionally for one user.
+    By default reads the aggregated positions (one row per symbol, purchase_price is
+    the weighted average cost); aggregated=False yields one row per lot.
+    """
+    if aggregated:
+        average_cost = case((Position.quantity != 0, Position.cost / Position.quantity), else_=0)
+        query = db.session.query(Position.user_id, Position.asset_type, Position.asset_symbol,
+                                 Position.quantity, average_cost)
+        if user_id is not None:
+            query = query.filter(Position.user_id == user_id)
+    else:
+        query = db.session.query(Holding.user_id, Holding.asset_type, Holding.asset_symbol,
+                                 Holding.quantity, Holding.purchase_price)
+        if user_id is not None:
+            query = query.filter(Holding.user_id == user_id)
+    return query
+
+
+def load_holdings(user_id=None, aggregated=True):
+    """
+    Load holdings as a columnar DataFrame (see holdings_query).
+    """
+    return frame_from_rows(holdings_query(user_id, aggregated).all())
+
+
+def frame_from_rows(rows, columns=HOLDING_COLUMNS):
+    """
+    Build the columnar holdings frame and add price_symbol, the symbol whose quote
+    values one unit in Rs. Currency holdings are priced through their *INR=X rate
+    (e.g. USD -> USDINR=X).
+    """
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    frame["quantity"] = frame["quantity"].astype("f8")
+    frame["purchase_price"] = frame["purchase_price"].astype("f8")
+    symbols = frame["asset_symbol"].astype(str).str.upper()
+    needs_rate = (frame["asset_type"] == "currency") & ~symbols.str.endswith("INR=X")
+    frame["price_symbol"] = frame["asset_symbol"].where(~needs_rate, symbols + "INR=X")
+    return frame
+
+
+def value_positions(frame, prices):
+    """
+    Join positions against a {price_symbol: price} mapping in one vectorized pass.
+    Non-numeric prices ('N/A') are valued at 0, as the holdings page always has.
+    Adds current_price, cost, market_value, profit_loss, profit_loss_pct and weight.
+    """
+    codes, uniques = pd.factorize(frame["price_symbol"])
+    price_vector = pd.to_numeric(pd.Series(uniques, dtype=object).map(prices), errors="coerce").to_numpy(dtype="f8")
+    current = price_vector[codes] if len(codes) else np.empty(0)
+
+    quantity = frame["quantity"].to_numpy()
+    purchase = frame["purchase_price"].to_numpy()
+    calc_price = np.nan_to_num(current, nan=0.0)
+    cost = quantity * purchase
+    market_value = quantity * calc_price
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(purchase != 0, (calc_price - purchase) / purchase * 100, 0.0)
+    total_value = market_value.sum()
+
+    valued = frame.copy()
+    valued["current_price"] = current
+    valued["cost"] = cost
+    valued["market_value"] = market_value
+    valued["profit_loss"] = market_value - cost
+    valued["profit_loss_pct"] = pnl_pct
+    valued["weight"] = market_value / total_value * 100 if total_value else 0.0
+    return valued
+
+
+def summarize(valued):
+    """
+    Aggregate figures for a valued portfolio, including allocation by asset_type.
+    """
+    total_cost = float(valued["cost"].sum())
+    market_value = float(valued["market_value"].sum())
+    by_type = valued.groupby("asset_type")["market_value"].sum()
+    return {
+        "total_cost": round(total_cost, 2),
+        "market_value": round(market_value, 2),
+        "profit_loss": round(market_value - total_cost, 2),
+        "profit_loss_pct": round((market_value - total_cost) / total_cost * 100, 2) if total_cost else 0,
+        "allocation": {asset_type: round(float(value / market_value * 100), 2) if market_value else 0
+                       for asset_type, value in by_type.items()},
+    }
+
+
+def value_all_users(prices, frame=None, unpriced_at_cost=False):
+    """
+    Value every user's portfolio at once. Returns a DataFrame indexed by user_id
+    with total cost, market value and profit/loss. With unpriced_at_cost, positions
+    without a price are carried at cost instead of 0.
+    """
+    if frame is None:
+        frame = load_holdings()
+    valued = value_positions(frame, prices)
+    if unpriced_at_cost:
+        valued["market_value"] = valued["market_value"].where(valued["current_price"].notna(), valued["cost"])
+    totals = valued.groupby("user_id")[["cost", "market_value"]].sum()
+    totals["profit_loss"] = totals["market_value"] - totals["cost"]
+    return totals
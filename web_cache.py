@@ -0,0 +1,259 @@
+import functools
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Static files are sent as direct-passthrough file responses and left uncompressed
+COMPRESSIBLE_TYPES = {"text/html", "application/json"}
+MIN_COMPRESS_SIZE = 500  # bytes; smaller bodies are not worth the header overhead
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # fast enough to run per response
+STATIC_MAX_AGE = 31536000  # one year, for fingerprinted (?v=) static URLs
+
+
+# -------------------------------
+# File-backed values
+class FileText:
+    """
+    Contents of a small text file, re-read only when its mtime or size changes.
+    The file is stat-ed at most once per check_interval seconds.
+    """
+
+    def __init__(self, path, default="", check_interval=1.0):
+        self.path = path
+        self.default = default
+        self.check_interval = check_interval
+        self._key = None
+        self._text = default
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if self._key is not None or self._checked == 0.0:
+                logger.error(f"Error reading {self.path}: {e}")
+            self._key, self._text = None, self.default
+            return
+        key = (st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            try:
+                with open(self.path, "r") as f:
+                    self._text = f.read()
+                self._key = key
+            except OSError as e:
+                logger.error(f"Error reading {self.path}: {e}")
+                self._key, self._text = None, self.default
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._refresh()
+                    self._checked = now
+        return self._text
+
+    @property
+    def version(self):
+        self.get()
+        return self._key
+
+
+# -------------------------------
+# Logged-in users
+class UserCache:
+    """
+    Column values of recently loaded users, so flask-login's user loader does not
+    query the database on every request. Entries expire after ttl seconds.
+    """
+
+    def __init__(self, model, ttl=300, max_entries=10000):
+        self.model = model
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._columns = [c.key for c in model.__table__.columns]
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def load(self, session, user_id):
+        """
+        Return the user attached to session without a query when cached, else load it.
+        """
+        from sqlalchemy.orm import make_transient_to_detached
+
+        now = time.monotonic()
+        entry = self._users.get(user_id)
+        if entry is not None and entry[0] > now:
+            user = self.model(**entry[1])
+            make_transient_to_detached(user)
+            return session.merge(user, load=False)
+        user = session.get(self.model, user_id)
+        if user is not None:
+            with self._lock:
+                if len(self._users) >= self.max_entries:
+                    self._users.clear()
+                self._users[user_id] = (now + self.ttl, {c: getattr(user, c) for c in self._columns})
+        return user
+
+    def discard(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+# -------------------------------
+# Fingerprinted static files
+class StaticVersions:
+    """
+    Short content hash per file under root, recomputed when the file changes.
+    version() combines the hashes of every file into one token, re-checked at
+    most once per check_interval seconds.
+    """
+
+    def __init__(self, root, check_interval=1.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._hashes = {}
+        self._version = None
+        self._checked = 0.0
+
+    def get(self, filename):
+        path = os.path.join(self.root, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._hashes.get(filename)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(path, "rb") as f:
+            digest = hashlib.md5(f.read()).hexdigest()[:12]
+        self._hashes[filename] = (key, digest)
+        return digest
+
+    def version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked >= self.check_interval:
+            digests = []
+            for directory, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    filename = os.path.relpath(os.path.join(directory, name), self.root)
+                    digests.append(f"{filename}:{self.get(filename)}")
+            self._version = hashlib.md5("\n".join(sorted(digests)).encode()).hexdigest()[:12]
+            self._checked = now
+        return self._version
+
+
+# -------------------------------
+# Compression
+def _accepted_encoding(accept_encoding):
+    if brotli is not None and "br" in accept_encoding:
+        return "br"
+    if "gzip" in accept_encoding:
+        return "gzip"
+    return None
+
+
+def compress_response(response, accept_encoding):
+    """
+    Compress a buffered HTML/JSON response body in place with brotli or gzip,
+    whichever the client accepts. Streamed and file responses are left alone.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    encoding = _accepted_encoding(accept_encoding or "")
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # The encoded body differs byte-for-byte; keep validators but mark them weak.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# -------------------------------
+# Conditional GET for pages rendered from versioned data
+def conditional_page(version):
+    """
+    Decorate a GET view whose output depends only on version() and the current
+    user, URL and flashed messages. Answers 304 Not Modified without running the
+    view when the client's ETag still matches; pages with pending flash messages
+    are always rendered. The ETag also covers the static files and templates (see
+    init_app), so a page linking an updated ?v= asset URL is sent again.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, request, session, make_response
+            from flask_login import current_user
+
+            if session.get("_flashes"):
+                return view(*args, **kwargs)
+            asset_version = current_app.extensions.get("web_cache_assets")
+            parts = (version(), asset_version() if asset_version else None,
+                     current_user.get_id(), request.full_path)
+            etag = hashlib.md5(repr(parts).encode()).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+                response.set_etag(etag, weak=True)
+                return response
+            response = make_response(view(*args, **kwargs))
+            response.set_etag(etag, weak=True)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True  # always revalidate
+            return response
+        return wrapper
+    return decorator
+
+
+# -------------------------------
+# Flask integration
+def init_app(app):
+    """
+    Add ?v=<content hash> to url_for('static', ...) URLs, serve those with
+    immutable one-year caching, and compress eligible responses.
+    """
+    from flask import request
+
+    static_versions = StaticVersions(app.static_folder)
+    template_versions = StaticVersions(os.path.join(app.root_path, app.template_folder))
+    app.extensions["web_cache_assets"] = lambda: (static_versions.version(), template_versions.version())
+
+    @app.url_defaults
+    def _static_version(endpoint, values):
+        if endpoint == "static" and "v" not in values and "filename" in values:
+            digest = static_versions.get(values["filename"])
+            if digest:
+                values["v"] = digest
+
+    @app.after_request
+    def _cache_and_compress(response):
+        if request.endpoint == "static" and request.args.get("v") and response.status_code in (200, 304):
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return compress_response(response, request.headers.get("Accept-Encoding"))
@@ -0,0 +1,10 @@
+"""
+Production WSGI entry point:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+See gunicorn.conf.py for the worker settings.
+"""
+from app import app
+
+application = app